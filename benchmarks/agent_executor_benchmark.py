@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Micro-benchmark of the ReAct executor setup per test run: building the tools, agent and executor
+for every run (previous execute_step) against the ExecutorFactory, which builds them once per
+browser session and only binds the tools to the context of the run.
+
+Run from the repository root (no browser or API key needed, the runs are not executed):
+    python -m benchmarks.agent_executor_benchmark --runs 50
+"""
+import argparse
+import itertools
+import time
+from typing import Callable
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.agents.output_parsers import JSONAgentOutputParser
+from rich import print
+from rich.table import Table
+
+from benchmarks.fake_llm import FakeChatModel
+from config import Config
+from src.discovery.interaction_agent.agent import InteractionAgent
+from src.discovery.interaction_agent.executor_factory import ExecutorFactory
+from src.discovery.interaction_agent.prompts import react_agent_prompt
+from src.discovery.interaction_agent.tool_context import ToolContext
+from src.discovery.page_outline import page_formats
+
+
+class BenchmarkDriver:
+    """
+    Stands in for a browser session, the tools are not called.
+    """
+
+
+def benchmark_config() -> Config:
+    # only the attributes used while building the executors, Config() would start a browser
+    cf = Config.__new__(Config)
+    cf.model = FakeChatModel()
+    cf.page_diff_max_changes = 50
+    cf.page_representation = {"interaction_agent": "html"}
+    cf.agent_max_iterations = 15
+    cf.agent_max_execution_time = 120
+    return cf
+
+
+def measure(func: Callable[[], object], runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ReAct executor setup per test run")
+    parser.add_argument("--runs", help="Test runs (approaches and replans) per measurement", type=int, default=50)
+    parser.add_argument("--sessions", help="Browser sessions the runs are spread over", type=int, default=3)
+    args = parser.parse_args()
+
+    cf = benchmark_config()
+    # only the tools of the agent are needed, InteractionAgent() would compile the whole graph
+    agent = InteractionAgent.__new__(InteractionAgent)
+    agent.cf = cf
+    init_tools = agent._init_tools
+    drivers = [BenchmarkDriver() for _ in range(args.sessions)]
+    runs = itertools.count()
+
+    def new_context() -> ToolContext:
+        return ToolContext(cf=cf, driver=drivers[next(runs) % len(drivers)], initial_uri="/")
+
+    def build_per_run() -> AgentExecutor:
+        tools = init_tools(new_context())
+        prompt = react_agent_prompt.partial(page_format=page_formats["html"])
+        solver = create_react_agent(cf.model, tools=tools, prompt=prompt, output_parser=JSONAgentOutputParser())
+        return AgentExecutor(agent=solver, tools=tools)
+
+    factory = ExecutorFactory(cf, init_tools)
+    per_run = measure(build_per_run, args.runs)
+    factory_run = measure(lambda: factory.get(new_context()), args.runs)
+
+    table = Table(title=f"Executor setup per run ({args.runs} runs, {args.sessions} sessions)")
+    table.add_column("Setup")
+    table.add_column("ms / run", justify="right")
+    table.add_column(f"ms / interaction ({args.runs} runs)", justify="right")
+    table.add_column("Executors built", justify="right")
+    table.add_row("build per run", f"{per_run * 1000:.2f}", f"{per_run * args.runs * 1000:.0f}", str(args.runs))
+    table.add_row(
+        "ExecutorFactory", f"{factory_run * 1000:.2f}", f"{factory_run * args.runs * 1000:.0f}", str(factory.builds)
+    )
+    print(table)
+    print(f"Speedup: {per_run / factory_run:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
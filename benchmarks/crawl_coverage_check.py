@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+"""
+Crawl coverage of the fixture app with and without near-duplicate page detection.
+
+Skipping near-duplicate pages must only skip their LLM stages: every page reachable from the
+initial page is still loaded (its links are followed), only fewer pages are analyzed.
+The pages are served through the Flask test client and the LLM is the fake one, so no browser
+or API key is needed. Exits with status 1 if the coverage differs.
+
+Run from the repository root:
+    python -m benchmarks.crawl_coverage_check --pages 25 --forms 5
+"""
+import argparse
+import sys
+import threading
+from typing import List, Set
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from langchain_core.output_parsers import StrOutputParser
+from rich import print
+from rich.table import Table
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fixture_app import create_fixture_app
+from config import Config
+from src.discovery.classes.schedule import Schedule
+from src.discovery.classes.siteinfo import SiteInfo
+from src.discovery.discovery import discover_page
+from src.discovery.llm.api_parser import LLM_ApiParser
+from src.discovery.llm.interaction_parser import LLM_InteractionParser
+from src.discovery.llm.summarizer import LLM_Summarizer
+from src.discovery.utils import parse_links
+from src.pretty_log import DiscoveryLog
+
+TARGET = "http://fixture"
+
+
+class FixtureDriver:
+    """
+    Stands in for a browser session: serves the fixture app through the Flask test client.
+    Scripts are not run, so the readiness and snapshot instrumentation fall back to their defaults.
+    """
+
+    def __init__(self, app) -> None:
+        self.client = app.test_client()
+        self.current_url = None
+        self.page_source = ""
+        self.loaded: List[str] = []
+
+    def get(self, url: str) -> None:
+        path = urlparse(url).path or "/"
+        self.current_url = url
+        self.page_source = self.client.get(path).get_data(as_text=True)
+        self.loaded.append(path)
+
+    def execute_script(self, *args):
+        return None
+
+    def get_log(self, log_type: str) -> list:
+        return []
+
+
+def check_config(near_duplicate_threshold: float | None) -> Config:
+    # only the attributes used by discover_page, Config() would start a browser
+    cf = Config.__new__(Config)
+    model = FakeChatModel()
+    cf.__dict__.update(
+        target=TARGET,
+        model=model,
+        advanced_model=model,
+        parser=StrOutputParser(),
+        selenium_rate=0,
+        page_ready_timeout=1,
+        network_capture_buffer=5000,
+        network_idle_ms=0,
+        dom_quiet_ms=0,
+        page_ready_poll_interval=0,
+        rule_based_api_parsing=True,
+        near_duplicate_threshold=near_duplicate_threshold,
+        near_duplicate_samples=2,
+        llm_history_window=None,
+        llm_history_token_budget=None,
+        interaction_chunk_tokens=12000,
+        interaction_chunk_workers=4,
+        page_representation={"summarizer": "html", "interaction_parser": "html"},
+    )
+    return cf
+
+
+def reachable_pages(app) -> Set[str]:
+    client = app.test_client()
+    seen, todo = {"/"}, ["/"]
+    while todo:
+        soup = BeautifulSoup(client.get(todo.pop()).get_data(as_text=True), "html.parser")
+        for link in parse_links(soup):
+            if link not in seen:
+                seen.add(link)
+                todo.append(link)
+    return seen
+
+
+def crawl(app, near_duplicate_threshold: float | None) -> tuple[Set[str], int]:
+    """
+    Crawl the fixture app like discover() with one browser (no template quota, no interactions).
+    Returns the loaded pages and the number of analyzed pages.
+    """
+    cf = check_config(near_duplicate_threshold)
+    driver = FixtureDriver(app)
+    si = SiteInfo(cf.target, cf.near_duplicate_threshold, cf.near_duplicate_samples)
+    schedule = Schedule(cf.target, "/")
+    lock = threading.RLock()
+    llm_summarizer, llm_interactionparser = LLM_Summarizer(cf), LLM_InteractionParser(cf)
+    llm_page_request_parser = LLM_ApiParser(cf)
+    while schedule.uris_todo:
+        uri = schedule.next_uri()
+        discover_page(
+            cf,
+            driver,
+            uri,
+            si,
+            schedule,
+            lock,
+            llm_summarizer,
+            llm_interactionparser,
+            llm_page_request_parser,
+            DiscoveryLog(),
+        )
+        schedule.finish_uri(uri)
+    return set(driver.loaded), len(si.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the crawl coverage with and without near-duplicate detection")
+    parser.add_argument("--pages", help="Number of fixture pages", type=int, default=25)
+    parser.add_argument("--forms", help="Number of fixture pages with a form", type=int, default=5)
+    parser.add_argument("--threshold", help="Near-duplicate threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    app = create_fixture_app(args.pages, args.forms)
+    reachable = reachable_pages(app)
+    table = Table(title=f"Crawl coverage ({args.pages} pages, {len(reachable)} reachable)")
+    table.add_column("Near-duplicates")
+    table.add_column("Pages loaded", justify="right")
+    table.add_column("Pages analyzed", justify="right")
+    table.add_column("Reachable pages missed", justify="right")
+    missed = {}
+    for name, threshold in (("kept (None)", None), (f"skipped ({args.threshold})", args.threshold)):
+        loaded, analyzed = crawl(app, threshold)
+        missed[name] = reachable - loaded
+        table.add_row(name, str(len(loaded)), str(analyzed), str(len(missed[name])))
+    print(table)
+    if any(missed.values()):
+        print(f"Coverage differs: {missed}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
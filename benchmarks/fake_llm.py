@@ -0,0 +1,249 @@
+import json
+import re
+import threading
+import time
+import typing
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+from bs4 import BeautifulSoup
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel, PrivateAttr
+
+from src.discovery.llm.memory import estimate_tokens
+
+
+def default_instance(schema: type) -> Any:
+    """
+    Build a placeholder value for the given type, filling pydantic models field by field.
+    """
+    origin = typing.get_origin(schema)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(schema) if arg is not type(None)]
+        return default_instance(args[0]) if len(args) == len(typing.get_args(schema)) else None
+    if origin in (list, List):
+        return []
+    if origin in (dict, Dict):
+        return {}
+    if origin is tuple:
+        return tuple(default_instance(arg) for arg in typing.get_args(schema))
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        values = {}
+        for name, field in schema.model_fields.items():
+            if field.is_required():
+                values[name] = default_instance(field.annotation)
+        return schema(**values)
+    return {str: "", int: 0, float: 0.0, bool: False}.get(schema)
+
+
+def _text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else json.dumps(message.content)
+
+
+def respond_api_model_list(messages: List[BaseMessage]) -> dict:
+    try:
+        page_requests = json.loads(_text(messages[-1]))
+    except json.JSONDecodeError:
+        return {"apis": []}
+    apis = []
+    for request in page_requests:
+        url = urlparse(request["url"])
+        segments = ["<id>" if segment.isdigit() else segment for segment in url.path.split("/")]
+        path_params = {"id": segment for segment in url.path.split("/") if segment.isdigit()}
+        try:
+            post_data = {key: str(value) for key, value in json.loads(request.get("postData") or "{}").items()}
+        except (json.JSONDecodeError, AttributeError):
+            post_data = dict(parse_qsl(request.get("postData") or ""))
+        apis.append(
+            {
+                "url": request["url"],
+                "domain": url.netloc,
+                "path": "/".join(segments),
+                "query_string": url.query,
+                "url_path_params": path_params,
+                "method": request["method"],
+                "headers": {key: str(value) for key, value in request.get("headers", {}).items()},
+                "postData": post_data,
+            }
+        )
+    return {"apis": apis}
+
+
+def _outline_interactions(outline: str) -> List[dict]:
+    interactions = []
+    form_indent = None
+    for line in outline.splitlines():
+        indent = len(line) - len(line.lstrip())
+        if form_indent is not None and indent <= form_indent:
+            form_indent = None
+        form = re.match(r"\s*- form(?: #(\S+))?", line)
+        if form:
+            name = form.group(1) or f"form-{len(interactions)}"
+            interactions.append({"name": f"Form {name}", "description": f"Submits the form {name}.", "input_fields": []})
+            form_indent = indent
+        elif form_indent is not None and "xpath=" in line:
+            role = line.split()[1]
+            field = re.search(r" name=(\S+)", line)
+            field_type = re.search(r"type=(\w+)", line)
+            interactions[-1]["input_fields"].append(
+                {"name": field.group(1) if field else role, "type": field_type.group(1) if field_type else role}
+            )
+    return interactions
+
+
+def respond_interaction_model_list(messages: List[BaseMessage]) -> dict:
+    text = _text(messages[-1])
+    if not text.lstrip().startswith("<"):
+        # page outline instead of HTML
+        return {"interactions": _outline_interactions(text)}
+    soup = BeautifulSoup(text, "html.parser")
+    interactions = []
+    for i, form in enumerate(soup.find_all("form")):
+        name = form.get("id") or f"form-{i}"
+        input_fields = [
+            {"name": field.get("name") or field.get("id") or field.name, "type": field.get("type") or field.name}
+            for field in form.find_all(["input", "select", "textarea", "button"])
+        ]
+        interactions.append(
+            {"name": f"Form {name}", "description": f"Submits the form {name}.", "input_fields": input_fields}
+        )
+    return {"interactions": interactions}
+
+
+def respond_ranked_interactions(messages: List[BaseMessage]) -> dict:
+    try:
+        names = json.loads(_text(messages[-1]))
+    except json.JSONDecodeError:
+        names = []
+    return {"interactions_list": [{"interaction": name, "approaches": 1} for name in names]}
+
+
+def respond_plan_model(messages: List[BaseMessage]) -> dict:
+    match = re.search(r"\*Approach\*:\n(.+)", _text(messages[-1]))
+    approach = match.group(1).strip() if match else "Submit the interaction with valid inputs."
+    return {"approach": approach, "plan": ["Click the submit button"]}
+
+
+default_responders: Dict[str, Callable[[List[BaseMessage]], dict]] = {
+    "ApiModelList": respond_api_model_list,
+    "InteractionModelList": respond_interaction_model_list,
+    "RankedInteractions": respond_ranked_interactions,
+    "HighHighLevelPlan": lambda messages: {"approaches": ["Submit the interaction with valid inputs."]},
+    "PlanModel": respond_plan_model,
+    "Act": lambda messages: {"action": {"text": "The test is complete."}},
+    "ReporterOutput": lambda messages: {"report": "The interaction was tested.", "new_interaction_context": []},
+}
+
+
+def react_response(messages: List[BaseMessage]) -> str:
+    """
+    Scripted ReAct agent: click the first submit button, then give the final answer.
+    """
+    if "\nObservation:" in _text(messages[-1]):
+        action = {"action": "Final Answer", "action_input": {"status": "success", "result": "Clicked submit."}}
+    else:
+        action = {
+            "action": "click",
+            "action_input": {"xpath_identifier": "(//button | //input[@type='submit'])[1]", "using_javascript": True},
+        }
+    return f"Action:\n```\n{json.dumps(action, indent=2)}\n```"
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model for benchmarks.
+
+    Structured output goes through the usual tool calling path, so the model works with
+    with_structured_output, the LLM cache and callbacks. Responses are built by the
+    responder registered for the schema name (falling back to a placeholder instance),
+    and every call sleeps for the configured latency.
+    """
+
+    latency: float = 0.0
+    responders: Dict[str, Callable[[List[BaseMessage]], dict]] = {}
+
+    _schemas: Dict[str, type] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _calls: int = PrivateAttr(default=0)
+    _prompt_tokens: int = PrivateAttr(default=0)
+    _completion_tokens: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self._calls,
+                "prompt_tokens": self._prompt_tokens,
+                "completion_tokens": self._completion_tokens,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._calls = self._prompt_tokens = self._completion_tokens = 0
+
+    def bind_tools(self, tools: List[Any], *, tool_choice: Optional[str] = None, **kwargs: Any):
+        formatted_tools = []
+        for tool in tools:
+            formatted = convert_to_openai_tool(tool)
+            if isinstance(tool, type):
+                self._schemas[formatted["function"]["name"]] = tool
+            formatted_tools.append(formatted)
+        return self.bind(tools=formatted_tools, **kwargs)
+
+    def _respond(self, name: str, messages: List[BaseMessage]) -> dict:
+        responder = self.responders.get(name) or default_responders.get(name)
+        if responder is not None:
+            return responder(messages)
+        schema = self._schemas.get(name)
+        return default_instance(schema).model_dump(exclude_unset=True) if schema is not None else {}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        tools = kwargs.get("tools")
+        if tools:
+            name = tools[0]["function"]["name"]
+            args = self._respond(name, messages)
+            content = ""
+            tool_calls = [{"name": name, "args": args, "id": f"call_{name}"}]
+            completion = json.dumps(args)
+        elif "Final Answer" in _text(messages[0]):
+            content = react_response(messages)
+            tool_calls = []
+            completion = content
+        else:
+            soup = BeautifulSoup(_text(messages[-1]), "html.parser")
+            title = soup.title.get_text(strip=True) if soup.title else "the page"
+            content = f"This page shows {title}."
+            tool_calls = []
+            completion = content
+
+        prompt_tokens = sum(estimate_tokens(_text(message)) for message in messages)
+        completion_tokens = estimate_tokens(completion)
+        with self._lock:
+            self._calls += 1
+            self._prompt_tokens += prompt_tokens
+            self._completion_tokens += completion_tokens
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+Micro-benchmark of the HTML filter against the previous deepcopy-and-walk implementation.
+
+Run from the repository root, with saved pages (e.g. "Save Page As" of large real pages):
+    python -m benchmarks.filter_html_benchmark page1.html page2.html
+Without arguments, a generated catalog page is used.
+"""
+import argparse
+import copy
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+from rich import print
+from rich.table import Table
+
+from src.discovery.utils import filter_page_source, keep_attributes, remove_tags
+
+
+def deepcopy_filter_html(soup: BeautifulSoup) -> BeautifulSoup:
+    """
+    The previous filter_html: copy the soup, then remove tags and attributes in place.
+    """
+    soup_cpy = copy.deepcopy(soup)
+    for tag in soup_cpy(remove_tags):
+        tag.extract()
+    for tag in soup_cpy.find_all(True):
+        for attribute in list(tag.attrs):
+            if not any(attribute.startswith(prefix) for prefix in keep_attributes):
+                del tag.attrs[attribute]
+    return soup_cpy
+
+
+def generated_page(rows: int = 3000) -> str:
+    row = """
+    <tr class="row" data-id="{i}" style="color: red" onclick="select({i})">
+        <td><a href="/item/{i}" data-track="item">Item {i}</a></td>
+        <td><span class="price" data-price="{i}.99">{i}.99 &euro;</span></td>
+        <td><button class="btn btn-primary" type="button" data-action="add">Add</button></td>
+    </tr>"""
+    head = '<head><meta charset="utf-8"><link rel="stylesheet" href="/main.css"><style>td {{ padding: 1px; }}</style></head>'
+    scripts = "<script>window.dataLayer = [];</script>" * 20
+    body = "".join(row.format(i=i) for i in range(rows))
+    return f"<!DOCTYPE html><html>{head}<body><table>{body}</table>{scripts}</body></html>"
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark filter_html implementations")
+    parser.add_argument("pages", help="HTML files to filter", nargs="*")
+    parser.add_argument("--repeat", help="Repetitions per page (the fastest is reported)", type=int, default=5)
+    args = parser.parse_args()
+
+    sources: List[tuple] = []
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            sources.append((path, f.read()))
+    if not sources:
+        sources.append(("generated catalog", generated_page()))
+
+    table = Table(title="filter_html benchmark")
+    table.add_column("Page")
+    table.add_column("Size (KB)", justify="right")
+    table.add_column("parse + deepcopy filter (ms)", justify="right")
+    table.add_column("single-pass filter (ms)", justify="right")
+    table.add_column("Speedup", justify="right")
+    table.add_column("Same content", justify="right")
+    for name, source in sources:
+        # both variants start from the raw page source, as the callers do
+        old = measure(lambda: deepcopy_filter_html(BeautifulSoup(source, "html.parser")), args.repeat)
+        new = measure(lambda: filter_page_source(source), args.repeat)
+        # text around removed tags is merged into one string now, so whitespace differs
+        same = "".join(deepcopy_filter_html(BeautifulSoup(source, "html.parser")).prettify().split()) == "".join(
+            filter_page_source(source).prettify().split()
+        )
+        table.add_row(
+            name,
+            f"{len(source) / 1024:.0f}",
+            f"{old * 1000:.1f}",
+            f"{new * 1000:.1f}",
+            f"{old / new:.1f}x",
+            "yes" if same else "no",
+        )
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
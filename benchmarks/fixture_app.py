@@ -0,0 +1,105 @@
+import threading
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+
+def _page_html(index: int, pages: int, forms: int) -> str:
+    links = [(index + 1) % pages, (2 * index + 1) % pages, (2 * index + 2) % pages]
+    links_html = "".join(f'<li><a href="/page/{link}">Page {link}</a></li>' for link in links)
+    form_html = ""
+    if index < forms:
+        form_html = f"""
+        <form id="form-{index}" onsubmit="submitForm(event, {index})">
+            <input name="title" type="text" placeholder="Title">
+            <input name="amount" type="number" placeholder="Amount">
+            <select name="category"><option>alpha</option><option>beta</option></select>
+            <button type="submit">Save</button>
+        </form>
+        """
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <title>Fixture Page {index}</title>
+    <style>body {{ font-family: sans-serif; }}</style>
+</head>
+<body>
+    <nav><a href="/">Home</a></nav>
+    <main>
+        <h1>Fixture Page {index}</h1>
+        <p id="item">Loading item...</p>
+        {form_html}
+        <p id="result"></p>
+        <ul>{links_html}</ul>
+    </main>
+    <script>
+        fetch("/api/items/{index}?view=full")
+            .then((response) => response.json())
+            .then((item) => (document.getElementById("item").textContent = item.name));
+
+        function submitForm(event, formIndex) {{
+            event.preventDefault();
+            const data = Object.fromEntries(new FormData(event.target).entries());
+            fetch(`/api/forms/${{formIndex}}`, {{
+                method: "POST",
+                headers: {{ "Content-Type": "application/json" }},
+                body: JSON.stringify(data),
+            }})
+                .then((response) => response.json())
+                .then((result) => (document.getElementById("result").textContent = result.message));
+        }}
+    </script>
+</body>
+</html>
+"""
+
+
+def create_fixture_app(pages: int = 25, forms: int = 5) -> Flask:
+    """
+    Create a local target with the given number of pages and forms.
+
+    Every page links to three other pages and loads a JSON item from /api/items/<id>,
+    the first `forms` pages also contain a form posting JSON to /api/forms/<id>.
+    """
+    app = Flask(__name__)
+
+    @app.route("/")
+    def index():
+        return _page_html(0, pages, forms)
+
+    @app.route("/page/<int:index>")
+    def page(index: int):
+        if index >= pages:
+            return "Not Found", 404
+        return _page_html(index, pages, forms)
+
+    @app.route("/api/items/<int:item_id>")
+    def item(item_id: int):
+        return jsonify({"id": item_id, "name": f"Item {item_id}", "view": request.args.get("view")})
+
+    @app.route("/api/forms/<int:form_id>", methods=["POST"])
+    def submit_form(form_id: int):
+        data = request.get_json(silent=True) or {}
+        return jsonify({"form": form_id, "message": f"Saved {data.get('title', '')}"})
+
+    return app
+
+
+class FixtureServer:
+    """
+    Serve the fixture app from a background thread.
+    """
+
+    def __init__(self, pages: int = 25, forms: int = 5, host: str = "127.0.0.1", port: int = 9780) -> None:
+        self.app = create_fixture_app(pages, forms)
+        self.server = make_server(host, port, self.app, threaded=True)
+        self.url = f"http://{host}:{port}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FixtureServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.thread.join()
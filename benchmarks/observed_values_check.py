@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""
+Observed values of the body parameters of an API with a nested JSON body.
+
+JSON bodies can have objects and lists as values, they must be recorded once per distinct value
+(ignoring the key order) like strings. Needs no browser or LLM. Exits with status 1 if the
+observed values differ.
+
+Run from the repository root:
+    python -m benchmarks.observed_values_check
+"""
+import sys
+
+from rich import print
+
+from src.discovery.classes.siteinfo import SiteInfo
+from src.discovery.llm.model_classes import ApiModel
+
+TARGET = "http://fixture"
+
+BODIES = [
+    {"user": {"name": "alice", "roles": ["admin", "dev"]}, "tags": ["a", "b"], "note": "first"},
+    # same values, other key order
+    {"tags": ["a", "b"], "note": "first", "user": {"roles": ["admin", "dev"], "name": "alice"}},
+    {"user": {"name": "bob", "address": {"city": "London", "zip": None}}, "tags": [], "note": "second"},
+]
+
+EXPECTED = {
+    "user": [BODIES[0]["user"], BODIES[2]["user"]],
+    "tags": [["a", "b"], []],
+    "note": ["first", "second"],
+}
+
+
+def nested_api(body: dict) -> ApiModel:
+    # the parsers flatten the body to strings, a model built without validation keeps the nested values
+    return ApiModel.model_construct(
+        url=f"{TARGET}/api/users",
+        domain="fixture",
+        path="/api/users",
+        query_string=None,
+        url_path_params=None,
+        method="POST",
+        headers={"Content-Type": "application/json"},
+        postData=body,
+    )
+
+
+def main():
+    si = SiteInfo(TARGET)
+    for body in BODIES:
+        si.add_apis([nested_api(body)])
+    api = si.get_api("POST", "/api/users")
+    observed = {param.name: param.observed_values for param in api.params}
+    for name, values in observed.items():
+        print(f"{name}: {values}")
+    if observed != EXPECTED:
+        print(f"Observed values differ, expected: {EXPECTED}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
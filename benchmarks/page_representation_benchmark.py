@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Token counts of the page representations given to the LLM: the filtered, prettified HTML and the page outline.
+
+Run from the repository root, with saved pages (e.g. "Save Page As" of large real pages):
+    python -m benchmarks.page_representation_benchmark page1.html page2.html
+Without arguments, generated pages are used. Tokens are counted with tiktoken if it is installed
+(the encoding of the configured model), otherwise estimated from the length.
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from bs4 import BeautifulSoup
+from rich import print
+from rich.table import Table
+
+from benchmarks.filter_html_benchmark import generated_page
+from benchmarks.fixture_app import _page_html
+from src.discovery.llm.memory import estimate_tokens
+from src.discovery.page_outline import page_outline
+from src.discovery.utils import filter_page_source
+
+
+def token_counter(model: str) -> tuple[str, Callable[[str], int]]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.encoding_for_model(model)
+        return f"tiktoken {encoding.name}", lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:  # not installed, or the encoding could not be loaded
+        return "estimated", estimate_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the token counts of the page representations")
+    parser.add_argument("pages", help="HTML files to compare", nargs="*")
+    parser.add_argument("--model", help="Model whose tokenizer is used", default="gpt-4o-mini")
+    args = parser.parse_args()
+
+    sources: List[tuple] = []
+    for path in args.pages:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            sources.append((path, f.read()))
+    if not sources:
+        sources.append(("fixture page with form", _page_html(0, 25, 5)))
+        sources.append(("generated catalog", generated_page()))
+
+    tokenizer, count_tokens = token_counter(args.model)
+    table = Table(title=f"Page representation tokens ({tokenizer})")
+    table.add_column("Page")
+    table.add_column("Size (KB)", justify="right")
+    table.add_column("html tokens", justify="right")
+    table.add_column("outline tokens", justify="right")
+    table.add_column("Reduction", justify="right")
+    table.add_column("outline (ms)", justify="right")
+    for name, source in sources:
+        html = filter_page_source(source).prettify()
+        start = time.perf_counter()
+        outline = page_outline(BeautifulSoup(source, "html.parser"))
+        elapsed = time.perf_counter() - start
+        html_tokens, outline_tokens = count_tokens(html), count_tokens(outline)
+        table.add_row(
+            name,
+            f"{len(source) / 1024:.0f}",
+            str(html_tokens),
+            str(outline_tokens),
+            f"{1 - outline_tokens / max(html_tokens, 1):.0%}",
+            f"{elapsed * 1000:.1f}",
+        )
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+"""
+End-to-end benchmark of discover() against the local fixture app, using the fake LLM.
+
+Run from the repository root:
+    python -m benchmarks.run_discovery --pages 25 --forms 5 --latency 0.2 --headless
+"""
+import argparse
+import os
+import resource
+import threading
+import time
+from argparse import Namespace
+
+from rich import print
+from rich.table import Table
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fixture_app import FixtureServer
+from config import Config
+from src.discovery.browser.pool import quit_driver
+from src.discovery.discovery import discover
+
+
+class BenchmarkConfig(Config):
+    """
+    Config using the fake LLM and counting WebDriver round trips of every driver.
+    """
+
+    def __init__(self, args: Namespace, fake_model: FakeChatModel) -> None:
+        self.webdriver_round_trips = 0
+        self._round_trip_lock = threading.Lock()
+        super().__init__(args)
+        if self.llm_cache is not None:
+            fake_model.cache = self.llm_cache
+        self.model = fake_model
+        self.advanced_model = fake_model
+
+    def create_driver(self):
+        driver = super().create_driver()
+        execute = driver.execute
+
+        def counting_execute(*args, **kwargs):
+            with self._round_trip_lock:
+                self.webdriver_round_trips += 1
+            return execute(*args, **kwargs)
+
+        driver.execute = counting_execute
+        return driver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark discover() against a local fixture app with a fake LLM")
+    parser.add_argument("--pages", help="Number of fixture pages", type=int, default=25)
+    parser.add_argument("--forms", help="Number of fixture pages with a form", type=int, default=5)
+    parser.add_argument("--latency", help="Fake LLM latency per call in seconds", type=float, default=0.0)
+    parser.add_argument("--port", help="Port of the fixture app", type=int, default=9780)
+    parser.add_argument("-w", "--workers", help="Number of browser sessions", type=int, default=1)
+    parser.add_argument("--llm-cache", help="Use the LLM response cache", action="store_true")
+    parser.add_argument("--headless", help="Run selenium in headless mode", action="store_true")
+    args = parser.parse_args()
+
+    # Config creates the OpenAI models before they are replaced by the fake one
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    fake_model = FakeChatModel(latency=args.latency)
+
+    with FixtureServer(pages=args.pages, forms=args.forms, port=args.port) as server:
+        cf = BenchmarkConfig(
+            Namespace(
+                target=server.url,
+                headless=args.headless,
+                workers=args.workers,
+                llm_cache=args.llm_cache,
+                replay=False,
+            ),
+            fake_model,
+        )
+        start = time.perf_counter()
+        try:
+            si = discover(cf)
+        finally:
+            quit_driver(cf.driver)
+        elapsed = time.perf_counter() - start
+
+    stats = fake_model.stats
+    pages = max(len(si.pages), 1)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    table = Table(title="discover() benchmark")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Pages discovered", str(len(si.pages)))
+    table.add_row("Interactions tested", str(len([i for i in si.interactions if i.tested])))
+    table.add_row("APIs found", str(len(si.apis)))
+    table.add_row("Elapsed (s)", f"{elapsed:.1f}")
+    table.add_row("Pages / min", f"{len(si.pages) / elapsed * 60:.1f}")
+    table.add_row("LLM calls / page", f"{stats['calls'] / pages:.1f}")
+    table.add_row("Prompt tokens / page", f"{stats['prompt_tokens'] / pages:.0f}")
+    table.add_row("Completion tokens / page", f"{stats['completion_tokens'] / pages:.0f}")
+    table.add_row("WebDriver round trips", str(cf.webdriver_round_trips))
+    table.add_row("WebDriver round trips / page", f"{cf.webdriver_round_trips / pages:.1f}")
+    table.add_row("Peak RSS (MB, Python process)", f"{peak_rss_mb:.0f}")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
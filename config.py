@@ -2,6 +2,9 @@ import os
 
 from langchain_anthropic import ChatAnthropic
 from src.log import logger
+from src.discovery.llm.cache import LLMResponseCache
+from src.discovery.browser.readiness import install_readiness_instrumentation
+from src.discovery.browser.network import get_network_capture, start_network_capture
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
@@ -20,15 +23,39 @@ class Config:
 
         ####### Selenium #######
         self.chromedriver_path = "/usr/bin/chromedriver"
-        self.service = ChromeService(executable_path=self.chromedriver_path)
         self.options = ChromeOptions()
         self.options.add_argument("--lang=en")
         if self.args.headless:
             self.options.add_argument("--headless=new")
-        self.options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True})
-        self.options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
-        self.driver = webdriver.Chrome(service=self.service, options=self.options)
+        # Network capture: "cdp" streams network events over a CDP connection,
+        # "performance_log" drains the chromedriver performance log instead
+        self.network_capture = "cdp"
+        self.network_capture_buffer = 5000
+        if self.network_capture == "performance_log":
+            self.options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True})
+            self.options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        self.driver = self.create_driver()
+        # Fallback delay for documents where the readiness signals are not available
         self.selenium_rate = 0.5
+        # Page readiness: wait for document.readyState, network idle and DOM quiescence (with a timeout)
+        self.page_ready_timeout = 5
+        self.network_idle_ms = 500
+        self.dom_quiet_ms = 300
+        self.page_ready_poll_interval = 0.05
+        # Number of browser sessions crawling pages in parallel (each with its own Chrome and performance log)
+        self.browser_workers = max(1, getattr(self.args, "workers", 1) or 1)
+
+        ####### LLM Cache #######
+        # Persistent response cache, enabled with --llm-cache; --replay never calls the model API
+        self.llm_cache_path = "llm_cache.sqlite"
+        self.llm_cache = None
+        model_kwargs = {}
+        if getattr(self.args, "llm_cache", False) or getattr(self.args, "replay", False):
+            self.llm_cache = LLMResponseCache(self.llm_cache_path, replay=getattr(self.args, "replay", False))
+            model_kwargs["cache"] = self.llm_cache
+            if self.llm_cache.replay:
+                # the API is never reached in replay mode, so a key is not required
+                model_kwargs["api_key"] = os.getenv("OPENAI_API_KEY", "replay")
 
         ####### Model #######
         # self.rate_limiter = InMemoryRateLimiter(
@@ -37,14 +64,89 @@ class Config:
         #     check_every_n_seconds=0.1,
         #     max_bucket_size=10,
         # )
-        self.model = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-        self.advanced_model = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+        self.model = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, **model_kwargs)
+        self.advanced_model = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, **model_kwargs)
         # self.model = ChatAnthropic(model_name="claude-3-5-sonnet-latest", temperature=0.2, rate_limiter=self.rate_limiter)
         # self.advanced_model = ChatAnthropic(
         #     model_name="claude-3-5-sonnet-latest", temperature=0.2, rate_limiter=self.rate_limiter
         # )
         self.parser = StrOutputParser()
 
+        ####### API Parsing #######
+        # Template captured requests with deterministic rules (ids, UUIDs, hashes in the path),
+        # only requests the rules can not classify are parsed by the LLM
+        self.rule_based_api_parsing = True
+
+        ####### Near-duplicate Pages #######
+        # Pages whose DOM skeleton is at least this similar (0-1) to an analyzed page are skipped before
+        # any LLM call, once near_duplicate_samples pages of that template were analyzed.
+        # None only skips pages with exactly the same content.
+        self.near_duplicate_threshold = 0.9
+        self.near_duplicate_samples = 2
+
+        ####### Crawl Frontier #######
+        # Outlinks are clustered into URI templates (path segment shape and query keys). Only the first
+        # template_quota URIs of a template are queued, later ones are sampled with template_sample_rate
+        # (seeded for reproducible crawls). Templates whose pages yield new interactions or APIs get
+        # template_novelty_bonus more URIs. None queues every URI.
+        self.template_quota = 3
+        self.template_sample_rate = 0.05
+        self.template_novelty_bonus = 3
+        self.template_sample_seed = 0
+
+        ####### Page Representation #######
+        # How the page is given to each LLM stage: "html" (filtered, prettified HTML) or "outline"
+        # (compact outline of the interactive and semantic elements with their XPath locators,
+        # usually a fraction of the tokens, see benchmarks/page_representation_benchmark.py)
+        self.page_representation = {
+            "summarizer": "html",
+            "interaction_parser": "html",
+            "interaction_agent": "html",
+            "get_page_soup": "html",
+        }
+
+        ####### Interaction Parsing #######
+        # Pages above interaction_chunk_tokens (approximate tokens) are split at form and section
+        # boundaries and the chunks are parsed concurrently by up to interaction_chunk_workers calls.
+        # None sends the whole page in one message.
+        self.interaction_chunk_tokens = 12000
+        self.interaction_chunk_workers = 4
+
+        ####### Interaction Agent #######
+        # Maximum number of concurrent LLM calls of the independent agent steps (e.g. the plans of the approaches)
+        self.agent_llm_concurrency = 3
+
+        ####### Agent Budgets #######
+        # Limits of the ReAct solver per task: iterations (tool calls), wall-clock seconds and tokens
+        # (prompt and completion). The token budgets per interaction and for the whole run also count
+        # the planner calls. A task stopped by a limit gets the status "budget_exhausted", once the
+        # interaction or total budget is exhausted the remaining tasks and replans are skipped.
+        # None disables a limit. Every iteration resends the page, so a task token budget should allow
+        # several times the tokens of the largest pages.
+        self.agent_max_iterations = 15
+        self.agent_max_execution_time = 120
+        self.agent_task_token_budget = None
+        self.agent_interaction_token_budget = None
+        self.agent_total_token_budget = None
+
+        ####### Page Diffs #######
+        # Maximum number of changed nodes reported in the structural page diffs given to the LLM
+        self.page_diff_max_changes = 50
+
+        ####### Checkpoints #######
+        # The discovery state is saved to checkpoint_path at most every checkpoint_interval seconds
+        # (between pages and interactions), --resume continues from the last checkpoint
+        self.checkpoint_path = "checkpoint.pkl"
+        self.checkpoint_interval = 60
+        self.resume = getattr(self.args, "resume", False)
+
+        ####### LLM History #######
+        # Bound the conversation history of the page parsers (API, interaction, summary).
+        # None keeps the full history; otherwise only the last N pages (or the pages fitting
+        # into the approximate token budget) are resent, along with a digest of prior results.
+        self.llm_history_window = None
+        self.llm_history_token_budget = None
+
         ####### Target #######
         website = self.args.target
 
@@ -59,6 +161,25 @@ class Config:
         ####### Check Config #######
         self.check_config()
 
+    def create_driver(self) -> webdriver.Chrome:
+        """
+        Start a new Chrome session with its own chromedriver service.
+        """
+        service = ChromeService(executable_path=self.chromedriver_path)
+        driver = webdriver.Chrome(service=service, options=self.options)
+        install_readiness_instrumentation(driver)
+        if self.network_capture == "cdp":
+            try:
+                start_network_capture(driver, self.network_capture_buffer)
+            except Exception as e:
+                driver.quit()
+                raise ValueError(
+                    f'Could not start the CDP network capture ({e}), set network_capture = "performance_log"'
+                )
+        else:
+            get_network_capture(driver, self.network_capture_buffer)
+        return driver
+
     def check_config(self) -> None:
         logger.debug("Checking Config")
         # TODO: Check if all required attributes are set/working
@@ -66,8 +187,32 @@ class Config:
             raise ValueError("Driver not set")
         if not hasattr(self, "selenium_rate"):
             raise ValueError("Selenium Rate not set")
+        if getattr(self, "network_capture", None) not in ("cdp", "performance_log"):
+            raise ValueError("Network Capture not set")
+        if not hasattr(self, "browser_workers") or self.browser_workers < 1:
+            raise ValueError("Browser Workers not set")
         if not hasattr(self, "model"):
             raise ValueError("Model not set")
+        if any(
+            self.page_representation.get(stage) not in ("html", "outline")
+            for stage in ("summarizer", "interaction_parser", "interaction_agent", "get_page_soup")
+        ):
+            raise ValueError("Page Representation not set")
+        if self.interaction_chunk_tokens is not None and self.interaction_chunk_tokens < 1:
+            raise ValueError("Interaction Chunk Tokens not set")
+        if self.interaction_chunk_workers < 1:
+            raise ValueError("Interaction Chunk Workers not set")
+        if self.agent_llm_concurrency < 1:
+            raise ValueError("Agent LLM Concurrency not set")
+        for budget in (
+            "agent_max_iterations",
+            "agent_max_execution_time",
+            "agent_task_token_budget",
+            "agent_interaction_token_budget",
+            "agent_total_token_budget",
+        ):
+            if getattr(self, budget) is not None and getattr(self, budget) <= 0:
+                raise ValueError(f"{budget.replace('_', ' ').title()} not set")
         if not hasattr(self, "parser"):
             raise ValueError("Parser not set")
         if not hasattr(self, "target"):
@@ -4,6 +4,7 @@ import threading
 import time
 from config import Config
 from src.graph.backend.app import init_app
+from src.discovery.browser.pool import quit_driver
 from src.discovery.discovery import discover
 from src.discovery.utils import output_to_file
 from src.log import logger
@@ -49,6 +50,18 @@ def main():
     )
     parser.add_argument("-t", "--target", help="Target website to discover", type=str)
     parser.add_argument("--headless", help="Run selenium in headless mode", action="store_true")
+    parser.add_argument(
+        "-w", "--workers", help="Number of browser sessions crawling pages in parallel", type=int, default=1
+    )
+    parser.add_argument(
+        "--llm-cache", help="Cache LLM responses on disk and reuse them in later runs", action="store_true"
+    )
+    parser.add_argument(
+        "--replay", help="Only use cached LLM responses, fail on cache misses instead of calling the API", action="store_true"
+    )
+    parser.add_argument(
+        "--resume", help="Continue an interrupted discovery from the last checkpoint", action="store_true"
+    )
     args = parser.parse_args()
     if args.discover and args.target is None:
         print(Text("Target is required for discovery mode", style="bold red"))
@@ -70,7 +83,7 @@ def main():
         logger.debug("EyeGee complete")
         print_eyegee_exec_footer()
 
-        cf.driver.quit()
+        quit_driver(cf.driver)
 
     if args.graph:
         # check if siteinfo.pkl exists
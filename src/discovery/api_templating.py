@@ -0,0 +1,159 @@
+import json
+import re
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+from src.discovery.llm.api_parser import LLM_ApiParser
+from src.discovery.llm.model_classes import ApiModel
+from src.log import logger
+
+# Path segments replaced by a URL path parameter
+id_segment_patterns = [
+    re.compile(r"^\d+$"),  # numeric ids
+    re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE),  # UUIDs
+    re.compile(r"^[0-9a-f]{24}$", re.IGNORECASE),  # ObjectIds
+    re.compile(r"^[0-9a-f]{32}$|^[0-9a-f]{40}$|^[0-9a-f]{64}$", re.IGNORECASE),  # MD5, SHA-1, SHA-256 hashes
+]
+
+# Path segments containing digits that are still part of the route
+static_segment_patterns = [
+    re.compile(r"^v\d+(\.\d+)*$", re.IGNORECASE),  # API versions (v1, v2.1)
+    re.compile(r"^(oauth|http|x)\d$", re.IGNORECASE),
+]
+
+# Responses that are API calls (None: the response was not received yet)
+api_mime_types = [
+    "application/json",
+    "application/xml",
+    "application/x-www-form-urlencoded",
+    "application/graphql",
+    "text/plain",
+    "text/xml",
+]
+
+
+class AmbiguousRequest(Exception):
+    """
+    The request can not be turned into an ApiModel by the rules.
+    """
+
+
+def classify_segment(segment: str) -> str:
+    """
+    Classify a URL path segment as "id", "static" or "ambiguous".
+    """
+    if any(pattern.match(segment) for pattern in id_segment_patterns):
+        return "id"
+    if not any(char.isdigit() for char in segment) or any(
+        pattern.match(segment) for pattern in static_segment_patterns
+    ):
+        return "static"
+    return "ambiguous"  # e.g. slugs like "item-42" or "abc123"
+
+
+def template_path(path: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Replace the id segments of the given path by URL path parameters.
+
+    /users/42/posts/7 -> /users/<id>/posts/<id2>, {"id": "42", "id2": "7"}
+    """
+    segments = path.split("/")
+    path_params = {}
+    for i, segment in enumerate(segments):
+        kind = classify_segment(segment)
+        if kind == "ambiguous":
+            raise AmbiguousRequest(f"Ambiguous path segment: {segment}")
+        if kind == "id":
+            name = "id" if len(path_params) == 0 else f"id{len(path_params) + 1}"
+            path_params[name] = segment
+            segments[i] = f"<{name}>"
+    return "/".join(segments), path_params
+
+
+def decode_post_data(post_data: str | None, headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Decode a JSON or form encoded request body into key-value pairs (none for an empty body).
+    """
+    if post_data is None or post_data == "":
+        return {}
+    content_type = next((value for key, value in headers.items() if key.lower() == "content-type"), "")
+    if "multipart/" in content_type:
+        raise AmbiguousRequest("Multipart body")
+    if "json" in content_type or post_data.lstrip().startswith(("{", "[")):
+        try:
+            body = json.loads(post_data)
+        except json.JSONDecodeError:
+            raise AmbiguousRequest("Invalid JSON body")
+        if not isinstance(body, dict):
+            raise AmbiguousRequest("JSON body is not an object")
+        return {key: value if isinstance(value, str) else json.dumps(value) for key, value in body.items()}
+    try:
+        return dict(parse_qsl(post_data, keep_blank_values=True, strict_parsing=True))
+    except ValueError:
+        raise AmbiguousRequest("Body is neither JSON nor form encoded")
+
+
+def is_same_site(host: str, target_host: str) -> bool:
+    """
+    Whether the host belongs to the target: the target host itself or one of its subdomains.
+    A leading www. of the target is dropped first, so api.example.com belongs to www.example.com
+    (but no other sibling: without the public suffix list, example.co.uk and foo.co.uk can not be told apart).
+    """
+    host, target_host = host.split(":")[0].lower(), target_host.split(":")[0].lower()
+    if host == target_host:
+        return True
+    if target_host.replace(".", "").isdigit():
+        return False  # IP addresses have no subdomains
+    if target_host.startswith("www."):
+        target_host = target_host[len("www.") :]
+    return host == target_host or host.endswith(f".{target_host}")
+
+
+def request_to_api_model(request: dict) -> ApiModel:
+    """
+    Build the ApiModel of a captured request, raising AmbiguousRequest if the rules can not decide.
+    """
+    mime_type = request.get("mimeType")
+    if mime_type is not None and not any(mime_type.startswith(api_type) for api_type in api_mime_types):
+        raise AmbiguousRequest(f"Not an API response: {mime_type}")
+    url = urlparse(request["url"])
+    path, path_params = template_path(url.path)
+    headers = {key: str(value) for key, value in (request.get("headers") or {}).items()}
+    return ApiModel(
+        url=request["url"],
+        domain=url.netloc,
+        path=path,
+        query_string=url.query,
+        url_path_params=path_params,
+        method=request["method"],
+        headers=headers,
+        postData=decode_post_data(request.get("postData"), headers),
+    )
+
+
+def extract_apis(
+    page_requests: List[dict], target: str, llm_page_request_parser: LLM_ApiParser, rule_based: bool = True
+) -> List[ApiModel]:
+    """
+    Turn the given page requests into ApiModels.
+
+    Requests to third-party hosts are dropped, the others are templated by the rules above.
+    Only the requests the rules can not classify are parsed with the LLM (all of them if rule_based is False).
+    """
+    if not rule_based:
+        return llm_page_request_parser.parse_apis(json.dumps(page_requests, indent=4))
+    target_host = urlparse(target).netloc
+    apis = []
+    ambiguous_requests = []
+    for request in page_requests:
+        if not is_same_site(urlparse(request["url"]).netloc, target_host):
+            logger.debug(f"Ignoring third-party request: {request['url']}")
+            continue
+        try:
+            apis.append(request_to_api_model(request))
+        except AmbiguousRequest as e:
+            logger.debug(f"Falling back to LLM for {request['method']} {request['url']}: {e}")
+            ambiguous_requests.append(request)
+    if len(ambiguous_requests) > 0:
+        apis.extend(llm_page_request_parser.parse_apis(json.dumps(ambiguous_requests, indent=4)))
+    return apis
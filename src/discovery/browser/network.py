@@ -0,0 +1,273 @@
+import json
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Deque, Dict, List
+
+import trio
+from selenium.common.exceptions import WebDriverException
+
+from src.log import logger
+
+# Requests that stay open by design, they never make the network idle
+long_lived_types = {"EventSource", "WebSocket"}
+
+
+class NetworkCapture:
+    """
+    Ring buffer of the network requests sent by one driver, with the status code and
+    content type of their responses attached.
+
+    Requests are fed either by a CDP listener (streaming Network.requestWillBeSent /
+    Network.responseReceived events) or, if no listener runs, by draining the new entries
+    of the driver's performance log. Callers drain the requests incrementally.
+
+    The requests still loading (until Network.loadingFinished / loadingFailed) and the time of
+    the last network activity are tracked as well, for the page readiness (see network_state).
+    """
+
+    def __init__(self, driver, capacity: int = 5000) -> None:
+        self._driver = weakref.ref(driver)
+        self._requests: Deque[dict] = deque(maxlen=capacity)
+        self._by_id: Dict[str, dict] = {}
+        self._seq = 0
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, float] = {}  # request id -> start (monotonic)
+        self._last_activity = time.monotonic()
+
+        self._listener: threading.Thread | None = None
+        self._listening = threading.Event()
+        self._listener_error: Exception | None = None
+        self._trio_token = None
+        self._cancel_scope = None
+
+    ####### Recording #######
+
+    def add_request(
+        self,
+        request_id: str,
+        url: str,
+        method: str,
+        headers: dict,
+        post_data: str | None,
+        resource_type: str | None = None,
+    ) -> None:
+        with self._lock:
+            self._last_activity = time.monotonic()
+            if resource_type not in long_lived_types:
+                # redirects reuse the request id, the request is still loading
+                self._inflight[request_id] = self._last_activity
+            if len(self._requests) == self._requests.maxlen:
+                evicted = self._requests[0]
+                if self._by_id.get(evicted["request_id"]) is evicted:
+                    del self._by_id[evicted["request_id"]]
+            self._seq += 1
+            record = {
+                "seq": self._seq,
+                "request_id": request_id,
+                "url": url,
+                "method": method,
+                "headers": headers,
+                "postData": post_data,
+                "status": None,
+                "mimeType": None,
+            }
+            self._requests.append(record)
+            self._by_id[request_id] = record
+
+    def add_response(self, request_id: str, status: int, mime_type: str) -> None:
+        with self._lock:
+            self._last_activity = time.monotonic()
+            record = self._by_id.get(request_id)
+            if record is not None:
+                record["status"] = status
+                record["mimeType"] = mime_type
+
+    def finish_request(self, request_id: str) -> None:
+        """
+        Mark the request as done loading (finished, failed or cancelled).
+        """
+        with self._lock:
+            self._last_activity = time.monotonic()
+            self._inflight.pop(request_id, None)
+
+    ####### Network Idle #######
+
+    def network_state(self, max_age: float) -> tuple[int, float]:
+        """
+        Return the number of requests still loading and the seconds since the last network activity.
+        Requests loading for longer than max_age seconds (e.g. long polling) are not counted.
+        """
+        self._poll_performance_log()
+        now = time.monotonic()
+        with self._lock:
+            inflight = sum(1 for start in self._inflight.values() if now - start < max_age)
+            return inflight, now - self._last_activity
+
+    ####### Draining #######
+
+    def reset(self) -> None:
+        """
+        Discard all requests captured so far, e.g. before loading a new page.
+        """
+        self._poll_performance_log()
+        with self._lock:
+            self._cursor = self._seq
+
+    def peek(self) -> List[dict]:
+        """
+        Return the requests captured since the last drain, without consuming them.
+        """
+        self._poll_performance_log()
+        with self._lock:
+            return [self._public(record) for record in self._requests if record["seq"] > self._cursor]
+
+    def drain(self) -> List[dict]:
+        """
+        Return the requests captured since the last drain (or reset) and consume them.
+        """
+        self._poll_performance_log()
+        with self._lock:
+            requests = [self._public(record) for record in self._requests if record["seq"] > self._cursor]
+            self._cursor = self._seq
+        return requests
+
+    @staticmethod
+    def _public(record: dict) -> dict:
+        return {key: value for key, value in record.items() if key not in ("seq", "request_id")}
+
+    def _poll_performance_log(self) -> None:
+        """
+        Feed the new performance log entries of the driver (only used without a CDP listener).
+        Every call to get_log returns only the entries added since the previous call.
+        """
+        if self._listening.is_set():
+            return
+        driver = self._driver()
+        if driver is None:
+            return
+        try:
+            logs = driver.get_log("performance")
+        except WebDriverException as e:
+            logger.debug(f"Could not read performance log: {e}")
+            return
+        for log in logs:
+            message = log["message"]
+            # skip the json parsing of all other events
+            if '"Network.requestWillBeSent"' in message:
+                params = json.loads(message)["message"]["params"]
+                request = params["request"]
+                self.add_request(
+                    params["requestId"],
+                    request["url"],
+                    request["method"],
+                    request["headers"],
+                    request.get("postData"),
+                    params.get("type"),
+                )
+            elif '"Network.responseReceived"' in message:
+                params = json.loads(message)["message"]["params"]
+                self.add_response(params["requestId"], params["response"]["status"], params["response"]["mimeType"])
+            elif '"Network.loadingFinished"' in message or '"Network.loadingFailed"' in message:
+                self.finish_request(json.loads(message)["message"]["params"]["requestId"])
+
+    ####### CDP Listener #######
+
+    def start_listener(self, timeout: float = 10) -> None:
+        """
+        Subscribe to the network events of the driver through CDP, in a background thread.
+        Raises the connection error if the listener could not be started.
+        """
+        self._listener = threading.Thread(target=trio.run, args=(self._listen,), daemon=True)
+        self._listener.start()
+        self._listening.wait(timeout)
+        if not self._listening.is_set():
+            raise self._listener_error or TimeoutError("CDP network listener did not start")
+
+    def stop_listener(self) -> None:
+        if self._trio_token is not None and self._cancel_scope is not None:
+            try:
+                trio.from_thread.run_sync(self._cancel_scope.cancel, trio_token=self._trio_token)
+            except trio.RunFinishedError:
+                pass
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+        self._listening.clear()
+
+    async def _listen(self) -> None:
+        driver = self._driver()
+        try:
+            async with driver.bidi_connection() as connection:
+                session, devtools = connection.session, connection.devtools
+                await session.execute(devtools.network.enable())
+                events = session.listen(
+                    devtools.network.RequestWillBeSent,
+                    devtools.network.ResponseReceived,
+                    devtools.network.LoadingFinished,
+                    devtools.network.LoadingFailed,
+                    buffer_size=1000,
+                )
+                with trio.CancelScope() as cancel_scope:
+                    self._cancel_scope = cancel_scope
+                    self._trio_token = trio.lowlevel.current_trio_token()
+                    self._listening.set()
+                    async for event in events:
+                        if isinstance(event, devtools.network.RequestWillBeSent):
+                            request = event.request
+                            self.add_request(
+                                str(event.request_id),
+                                request.url,
+                                request.method,
+                                dict(request.headers),
+                                getattr(request, "post_data", None),
+                                event.type_.value if event.type_ is not None else None,
+                            )
+                        elif isinstance(event, devtools.network.ResponseReceived):
+                            self.add_response(str(event.request_id), event.response.status, event.response.mime_type)
+                        else:
+                            self.finish_request(str(event.request_id))
+        except Exception as e:
+            self._listener_error = e
+            logger.error(f"CDP network listener stopped: {e}")
+        finally:
+            self._listening.clear()
+
+
+_captures: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_captures_lock = threading.Lock()
+
+
+def get_network_capture(driver, capacity: int = 5000) -> NetworkCapture:
+    """
+    Return the network capture of the given driver, creating one that reads the
+    performance log if none was started.
+    """
+    with _captures_lock:
+        capture = _captures.get(driver)
+        if capture is None:
+            capture = NetworkCapture(driver, capacity)
+            _captures[driver] = capture
+        return capture
+
+
+def start_network_capture(driver, capacity: int = 5000) -> NetworkCapture:
+    """
+    Start streaming the network events of the given driver through CDP.
+    """
+    capture = NetworkCapture(driver, capacity)
+    capture.start_listener()
+    with _captures_lock:
+        _captures[driver] = capture
+    return capture
+
+
+def stop_network_capture(driver) -> None:
+    """
+    Stop the CDP listener of the given driver (if any), before the driver is quit.
+    """
+    with _captures_lock:
+        capture = _captures.pop(driver, None)
+    if capture is not None:
+        capture.stop_listener()
@@ -0,0 +1,76 @@
+from selenium.common.exceptions import WebDriverException
+
+from src.discovery.browser.readiness import instrumentation_script
+from src.log import logger
+
+# Returns (and clears) the changes recorded by the MutationObserver of the instrumentation,
+# along with the URL and the forms added since the previous call. arguments[0]: maximum number
+# of changes recorded until the next call.
+take_page_changes_script = (
+    instrumentation_script
+    + """
+const state = window.__eyegee;
+const forms = Array.from(document.forms).map((form) => ({
+    path: state.pathOf(form),
+    action: form.getAttribute("action"),
+    method: (form.getAttribute("method") || "get").toUpperCase(),
+    fields: Array.from(form.elements).map((field) => field.name || field.id || field.type).filter(Boolean),
+}));
+const formKeys = forms.map((form) => `${form.path} ${form.action}`);
+const knownForms = state.knownForms;
+const changes = {
+    docId: state.docId,
+    url: location.href,
+    urlChanged: location.href !== state.lastUrl,
+    changes: state.changes,
+    omitted: state.omitted,
+    newForms: knownForms === null ? [] : forms.filter((form, i) => !knownForms.includes(formKeys[i])),
+};
+state.changes = [];
+state.omitted = 0;
+state.maxChanges = arguments[0];
+state.lastUrl = location.href;
+state.knownForms = formKeys;
+return changes;
+"""
+)
+
+
+def take_page_changes(driver, max_changes: int = 50) -> dict | None:
+    """
+    Return the page changes recorded in the browser since the previous call, in one round trip.
+
+    Returns None if the changes are not available (e.g. the instrumentation is not supported).
+    """
+    try:
+        changes = driver.execute_script(take_page_changes_script, max_changes)
+    except WebDriverException as e:
+        logger.debug(f"Could not take page changes: {e}")
+        return None
+    return changes if isinstance(changes, dict) else None
+
+
+def format_page_changes(changes: dict) -> str:
+    """
+    Format the page changes for the LLM, one change per line (same notation as the DOM diff).
+    """
+    lines = []
+    if changes["urlChanged"]:
+        lines.append(f"URL changed to {changes['url']}")
+    for change in changes["changes"]:
+        if change["type"] == "added":
+            lines.append(f"+ {change['path']}: {change['html']}")
+        elif change["type"] == "removed":
+            lines.append(f"- {change['path']}: {change['html']}")
+        elif change["type"] == "attribute":
+            lines.append(f"~ {change['path']} @{change['name']}: {change['value']!r}")
+        else:
+            lines.append(f"~ {change['path']}/text(): {change['text']!r}")
+    if changes["omitted"] > 0:
+        lines.append(f"... {changes['omitted']} more changes omitted")
+    for form in changes["newForms"]:
+        lines.append(
+            f"New form {form['path']} ({form['method']} {form['action'] or 'no action'}): "
+            f"fields {', '.join(form['fields']) or 'none'}"
+        )
+    return "\n".join(lines) if lines else "No changes on the page."
@@ -0,0 +1,133 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from config import Config
+from src.discovery.browser.network import stop_network_capture
+from src.log import logger
+
+
+class BrowserPool:
+    """
+    Pool of WebDriver sessions. Every session is a separate Chrome instance, so each one
+    keeps its own cookies, page state and performance log.
+
+    The main driver (cf.driver) is always the first session of the pool.
+    """
+
+    def __init__(self, cf: Config, size: int) -> None:
+        self.cf = cf
+        self.size = max(1, size)
+        self.drivers: List[WebDriver] = [cf.driver]
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        self._idle.put(cf.driver)
+        for _ in range(self.size - 1):
+            driver = cf.create_driver()
+            self.drivers.append(driver)
+            self._idle.put(driver)
+        logger.debug(f"Browser pool started with {self.size} session(s)")
+
+    def acquire(self) -> WebDriver:
+        """
+        Take an idle driver from the pool, blocking until one is available.
+        """
+        return self._idle.get()
+
+    def release(self, driver: WebDriver) -> None:
+        """
+        Return the given driver to the pool.
+        """
+        self._idle.put(driver)
+
+    @contextmanager
+    def lease(self) -> Iterator[WebDriver]:
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def quit(self) -> None:
+        """
+        Quit all drivers started by the pool. The main driver is left to the caller.
+        """
+        with self._lock:
+            for driver in self.drivers[1:]:
+                try:
+                    quit_driver(driver)
+                except Exception as e:
+                    logger.error(f"Error quitting driver: {e}")
+            self.drivers = self.drivers[:1]
+
+
+def quit_driver(driver: WebDriver) -> None:
+    """
+    Stop the network capture of the driver and quit it.
+    """
+    stop_network_capture(driver)
+    driver.quit()
+
+
+# Returns the items of the localStorage and sessionStorage of the current origin
+get_storage_script = """
+const items = (storage) => {
+    const copy = {};
+    for (let i = 0; i < storage.length; i++) {
+        const key = storage.key(i);
+        copy[key] = storage.getItem(key);
+    }
+    return copy;
+};
+return { localStorage: items(window.localStorage), sessionStorage: items(window.sessionStorage) };
+"""
+
+# Replaces the items of the localStorage and sessionStorage of the current origin. arguments: the items of both
+set_storage_script = """
+const fill = (storage, items) => {
+    storage.clear();
+    for (const [key, value] of Object.entries(items)) storage.setItem(key, value);
+};
+fill(window.localStorage, arguments[0]);
+fill(window.sessionStorage, arguments[1]);
+"""
+
+
+def get_session_state(driver: WebDriver) -> dict:
+    """
+    Return the cookies and the storage of the given session, the driver has to be on a page of the target.
+    """
+    try:
+        storage = driver.execute_script(get_storage_script)
+    except WebDriverException as e:
+        logger.debug(f"Could not read the storage: {e}")
+        storage = None
+    if not isinstance(storage, dict):
+        storage = {"localStorage": {}, "sessionStorage": {}}
+    return {"cookies": driver.get_cookies(), **storage}
+
+
+def reset_session(driver: WebDriver, target: str, state: dict) -> None:
+    """
+    Replace the cookies and storage of the target in the given session by the given state (see get_session_state),
+    so every test starts from the same browser state whichever session of the pool it runs in.
+    The main session (cf.driver) is leased as well, so its state must come back unchanged (e.g. an auth token in
+    the localStorage of an SPA).
+    """
+    # cookies and storage can only be changed on a page of the target
+    driver.get(target)
+    driver.delete_all_cookies()
+    try:
+        driver.execute_script(set_storage_script, state["localStorage"], state["sessionStorage"])
+    except WebDriverException as e:
+        logger.debug(f"Could not set the storage: {e}")
+    for cookie in state["cookies"]:
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException as e:
+            logger.debug(f"Could not set cookie {cookie.get('name')}: {e}")
@@ -0,0 +1,157 @@
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from src.discovery.browser.network import get_network_capture
+from src.log import logger
+
+# Installed into every new document (through CDP) to track DOM mutations (and the changed
+# subtrees, see page_changes.py) and pending navigations. The network activity comes from the
+# CDP network events of the driver (see NetworkCapture). Safe to run more than once per document.
+instrumentation_script = """
+(() => {
+    if (window.__eyegee) return;
+    const state = {
+        // unique per document, the mutation count restarts with every document
+        docId: `${performance.timeOrigin}-${Math.random().toString(36).slice(2)}`,
+        lastMutation: performance.now(),
+        mutations: 0,
+        unloading: false,
+        // changed subtrees since they were last taken
+        changes: [],
+        omitted: 0,
+        maxChanges: 50,
+        lastUrl: location.href,
+        knownForms: null,
+    };
+    window.__eyegee = state;
+
+    const keepAttributes = [
+        "id", "class", "role", "href", "placeholder", "name", "type", "src", "alt",
+        "value", "disabled", "hidden", "checked", "selected", "open",
+    ];
+    // compact XPath-like path: tag#id, or tag[n] if there are several siblings with that tag
+    state.pathOf = (node) => {
+        const parts = [];
+        while (node && node.nodeType === 1 && node !== document.documentElement) {
+            const name = node.localName;
+            if (node.id) {
+                parts.unshift(`${name}#${node.id}`);
+                return "//" + parts.join("/");
+            }
+            const parent = node.parentElement;
+            const siblings = parent ? Array.from(parent.children).filter((child) => child.localName === name) : [];
+            parts.unshift(siblings.length > 1 ? `${name}[${siblings.indexOf(node) + 1}]` : name);
+            node = parent;
+        }
+        return "/html/" + parts.join("/");
+    };
+    const snippet = (node) => {
+        const text = (node.nodeType === 1 ? node.outerHTML : node.textContent).replace(/\\s+/g, " ").trim();
+        return text.length > 200 ? text.slice(0, 200) + "..." : text;
+    };
+    const ignored = (node) => {
+        const element = node.nodeType === 1 ? node : node.parentElement;
+        return !element || element.closest("head, script, style, noscript") !== null;
+    };
+    const relevant = (node) => node.nodeType === 1 || (node.nodeType === 3 && node.textContent.trim() !== "");
+    const record = (makeChange) => {
+        if (state.changes.length < state.maxChanges) state.changes.push(makeChange());
+        else state.omitted++;
+    };
+    const recordMutation = (mutation) => {
+        if (ignored(mutation.target)) return;
+        if (mutation.type === "childList") {
+            for (const node of mutation.addedNodes) {
+                if (relevant(node)) record(() => ({ type: "added", path: state.pathOf(mutation.target), html: snippet(node) }));
+            }
+            for (const node of mutation.removedNodes) {
+                if (relevant(node)) record(() => ({ type: "removed", path: state.pathOf(mutation.target), html: snippet(node) }));
+            }
+        } else if (mutation.type === "attributes") {
+            const name = mutation.attributeName;
+            if (keepAttributes.includes(name) || name.startsWith("aria-")) {
+                record(() => ({ type: "attribute", path: state.pathOf(mutation.target), name, value: mutation.target.getAttribute(name) }));
+            }
+        } else {
+            record(() => ({ type: "text", path: state.pathOf(mutation.target.parentElement), text: snippet(mutation.target) }));
+        }
+    };
+
+    new MutationObserver((mutations) => {
+        state.mutations++;
+        state.lastMutation = performance.now();
+        mutations.forEach(recordMutation);
+    }).observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+
+    window.addEventListener("beforeunload", () => {
+        state.unloading = true;
+        // the navigation may be cancelled, or the target may be a download
+        setTimeout(() => { state.unloading = false; }, 2000);
+    });
+})();
+"""
+
+# Returns the readiness signals of the current document, installing the instrumentation if it is missing
+readiness_probe_script = (
+    instrumentation_script
+    + """
+const state = window.__eyegee;
+const now = performance.now();
+return {
+    readyState: document.readyState,
+    domQuietMs: now - state.lastMutation,
+    unloading: state.unloading,
+};
+"""
+)
+
+
+def install_readiness_instrumentation(driver) -> None:
+    """
+    Install the readiness instrumentation into every document the driver loads from now on.
+    """
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": instrumentation_script})
+    except WebDriverException as e:
+        logger.error(f"Could not install readiness instrumentation: {e}")
+
+
+def wait_until_ready(cf, driver=None, timeout: float | None = None) -> bool:
+    """
+    Wait until the current page is ready: document.readyState is complete, no requests are
+    loading (all resource types, from the CDP network events of the driver) and neither
+    network nor DOM changed for the configured quiet periods.
+
+    Returns False if the page did not become ready before the timeout.
+    """
+    driver = driver or cf.driver
+    network = get_network_capture(driver, cf.network_capture_buffer)
+    timeout = cf.page_ready_timeout if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            state = driver.execute_script(readiness_probe_script)
+        except WebDriverException as e:
+            # e.g. an alert is open or the document is being replaced
+            logger.debug(f"Readiness probe failed: {e}")
+            state = None
+        if state is not None and not isinstance(state, dict):
+            # instrumentation not supported for this document, fall back to the fixed delay
+            time.sleep(cf.selenium_rate)
+            return True
+        # requests loading for longer than the timeout would never let the page become ready
+        inflight, network_quiet = network.network_state(max_age=timeout)
+        if (
+            state is not None
+            and state["readyState"] == "complete"
+            and not state["unloading"]
+            and inflight == 0
+            and network_quiet * 1000 >= cf.network_idle_ms
+            and state["domQuietMs"] >= cf.dom_quiet_ms
+        ):
+            return True
+        if time.monotonic() >= deadline:
+            logger.debug(f"Page not ready after {timeout}s: {state}, {inflight} requests loading")
+            return False
+        time.sleep(cf.page_ready_poll_interval)
@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from functools import cached_property
+from typing import List
+
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import WebDriverException
+
+from src.discovery.browser.readiness import instrumentation_script
+from src.discovery.llm.memory import estimate_tokens
+from src.discovery.page_chunks import chunk_html, chunk_outline
+from src.discovery.page_outline import page_outline
+from src.discovery.utils import filter_page_source
+from src.log import logger
+
+# Returns the version of the current DOM: the document id and its mutation count
+dom_version_script = (
+    instrumentation_script
+    + """
+const state = window.__eyegee;
+return `${state.docId}:${state.mutations}`;
+"""
+)
+
+
+class PageSnapshot:
+    """
+    Page source of one DOM state, with its parsed, filtered, prettified and outlined forms (built on first use).
+
+    Snapshots are shared between callers, so the soups must not be modified.
+    """
+
+    def __init__(self, page_source: str) -> None:
+        self.page_source = page_source
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.page_source, "html.parser")
+
+    @cached_property
+    def filtered_soup(self) -> BeautifulSoup:
+        return filter_page_source(self.page_source)
+
+    @cached_property
+    def filtered_str(self) -> str:
+        return self.filtered_soup.prettify()
+
+    @cached_property
+    def outline(self) -> str:
+        return page_outline(self.soup)
+
+    def render(self, representation: str) -> str:
+        """
+        Return the page for an LLM prompt: "html" (filtered, prettified HTML) or "outline" (see page_outline.py).
+        """
+        return self.outline if representation == "outline" else self.filtered_str
+
+    def render_chunks(self, representation: str, token_budget: int | None) -> List[str]:
+        """
+        Return the page split into chunks of about token_budget tokens (see page_chunks.py), None does not split.
+        """
+        page = self.render(representation)
+        if token_budget is None or estimate_tokens(page) <= token_budget:
+            return [page]
+        if representation == "outline":
+            return chunk_outline(self.outline, token_budget)
+        return chunk_html(self.filtered_soup, token_budget)
+
+
+class SnapshotCache:
+    """
+    Snapshots of the recent DOM states of one driver.
+
+    The DOM version (document id and mutation count, from the readiness instrumentation)
+    costs one small script call, the page source is only transferred when the DOM changed.
+    Without the instrumentation, snapshots are keyed by the hash of the page source.
+    """
+
+    def __init__(self, driver, size: int = 8) -> None:
+        self._driver = weakref.ref(driver)
+        self.size = size
+        self._snapshots: "OrderedDict[str, PageSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _dom_version(self, driver) -> str | None:
+        try:
+            version = driver.execute_script(dom_version_script)
+        except WebDriverException as e:
+            logger.debug(f"Could not read DOM version: {e}")
+            return None
+        return version if isinstance(version, str) else None
+
+    def get(self) -> PageSnapshot:
+        """
+        Return the snapshot of the current DOM state.
+        """
+        driver = self._driver()
+        version = self._dom_version(driver)
+        with self._lock:
+            if version is not None and version in self._snapshots:
+                self._snapshots.move_to_end(version)
+                self.hits += 1
+                return self._snapshots[version]
+
+        page_source = driver.page_source
+        key = version if version is not None else hashlib.sha1(page_source.encode()).hexdigest()
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                self.misses += 1
+                snapshot = PageSnapshot(page_source)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.size:
+                    self._snapshots.popitem(last=False)
+            else:
+                self.hits += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+
+_caches: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_snapshot(driver) -> PageSnapshot:
+    """
+    Return the snapshot of the current DOM state of the given driver, from its snapshot cache.
+    """
+    with _caches_lock:
+        cache = _caches.get(driver)
+        if cache is None:
+            cache = SnapshotCache(driver)
+            _caches[driver] = cache
+    return cache.get()
@@ -0,0 +1,60 @@
+import os
+import pickle
+import time
+from typing import Callable
+
+from src.log import logger
+
+CHECKPOINT_VERSION = 3
+
+
+class Checkpointer:
+    """
+    Periodically saves the discovery state to disk, so an interrupted run can be resumed.
+
+    The state is written to a temporary file first and then moved over the checkpoint,
+    so a crash while saving never leaves a truncated checkpoint behind.
+    """
+
+    def __init__(self, path: str, interval: float, get_state: Callable[[], dict]) -> None:
+        self.path = path
+        self.interval = interval
+        self.get_state = get_state
+        self.last_saved = time.monotonic()
+
+    def save(self) -> None:
+        state = {"version": CHECKPOINT_VERSION, **self.get_state()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.monotonic()
+        logger.debug(f"Saved checkpoint to {self.path}")
+
+    def maybe_save(self) -> None:
+        """
+        Save the state if the checkpoint interval has passed since the last save.
+        """
+        if time.monotonic() - self.last_saved >= self.interval:
+            try:
+                self.save()
+            except Exception as e:
+                # a failed checkpoint must not stop the discovery
+                logger.error(f"Could not save checkpoint: {e}")
+
+
+def load_checkpoint(path: str, target: str) -> dict:
+    """
+    Load the discovery state saved at the given path.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"No checkpoint found at {path}")
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} was written by an incompatible version")
+    if state["si"].target != target:
+        raise ValueError(f"Checkpoint {path} belongs to target {state['si'].target}, not {target}")
+    return state
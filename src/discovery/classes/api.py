@@ -1,14 +1,28 @@
 
 
 
+import json
+from typing import Any, Dict, List, Set
+
+
+def observed_value_key(value: Any) -> str:
+    """
+    Hashable key of an observed value, JSON bodies can have dicts and lists as values.
+    """
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+
+
 class Parameter:
     def __init__(self, name: str, param_type: str) -> None:
         self.name = name
         self.observed_values = []
+        self._observed_values: Set[str] = set()  # index of observed_values (see observed_value_key)
         self.param_type = param_type
     
-    def add_observed_value(self, value: str) -> None:
-        if value not in self.observed_values:
+    def add_observed_value(self, value: Any) -> None:
+        key = observed_value_key(value)
+        if key not in self._observed_values:
+            self._observed_values.add(key)
             self.observed_values.append(value)
 
 
@@ -17,16 +31,16 @@ class Api:
         self.method = method
         self.path = path
 
-        self.params = []
+        self.params: List[Parameter] = []
+        self._params_index: Dict[str, Parameter] = {}  # name -> parameter
 
     def add_param(self, param_name: str, param_type: str) -> None:
         found = self.get_param(param_name)
         if found is None:
-            self.params.append(Parameter(param_name, param_type))
+            param = Parameter(param_name, param_type)
+            self.params.append(param)
+            self._params_index[param_name] = param
 
     def get_param(self, param_name: str) -> Parameter:
-        for param in self.params:
-            if param.name == param_name:
-                return param
-        return None
+        return self._params_index.get(param_name)
         
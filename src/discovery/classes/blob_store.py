@@ -0,0 +1,65 @@
+import hashlib
+import threading
+import zlib
+from typing import Dict
+
+
+class BlobStore:
+    """
+    Content-addressed store of compressed text (e.g. page sources).
+
+    Blobs are keyed by the sha256 of their content, so identical snapshots are stored once.
+    """
+
+    def __init__(self, compression_level: int = 6) -> None:
+        self.compression_level = compression_level
+        self.blobs: Dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # the lock can not be pickled
+        with self.lock:
+            state = self.__dict__.copy()
+            state["blobs"] = dict(self.blobs)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.blobs)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.blobs
+
+    @property
+    def size(self) -> int:
+        """
+        Compressed size of all blobs in bytes.
+        """
+        with self.lock:
+            return sum(len(blob) for blob in self.blobs.values())
+
+    def put(self, text: str) -> str:
+        """
+        Store the given text, returns its key.
+        """
+        data = text.encode()
+        key = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if key in self.blobs:
+                return key
+        blob = zlib.compress(data, self.compression_level)
+        with self.lock:
+            self.blobs.setdefault(key, blob)
+        return key
+
+    def get(self, key: str) -> str:
+        """
+        Return the text stored under the given key.
+        """
+        with self.lock:
+            blob = self.blobs[key]
+        return zlib.decompress(blob).decode()
@@ -0,0 +1,89 @@
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+FINGERPRINT_BITS = 64
+
+
+def skeleton_shingles(soup: BeautifulSoup, size: int = 4) -> Set[str]:
+    """
+    Return the shingles (runs of `size` consecutive tags, in document order) of the DOM skeleton.
+
+    Tags are identified by their name, depth and classes, the text content is ignored,
+    so pages rendered from the same template share most of their shingles.
+    """
+    tokens = []
+    stack = [(child, 1) for child in reversed(soup.contents)]
+    while stack:
+        tag, depth = stack.pop()
+        if not isinstance(tag, Tag):
+            continue
+        classes = ".".join(sorted(tag.get("class") or []))
+        tokens.append(f"{depth}:{tag.name}.{classes}")
+        stack.extend((child, depth + 1) for child in reversed(tag.contents))
+    if len(tokens) < size:
+        return {"|".join(tokens)}
+    return {"|".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def simhash(features: Set[str]) -> int:
+    """
+    64 bit SimHash of the given features: similar sets get fingerprints with a small Hamming distance.
+    """
+    counts = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            counts[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(FINGERPRINT_BITS) if counts[bit] > 0)
+
+
+class FingerprintIndex:
+    """
+    Index of page fingerprints for near-duplicate lookups.
+
+    Fingerprints within max_distance bits of each other differ in at most max_distance of the
+    max_distance + 1 bands, so they share at least one band bucket: a lookup only compares
+    against the fingerprints of its buckets instead of all indexed pages.
+    """
+
+    def __init__(self, threshold: float = 0.9) -> None:
+        self.max_distance = round(FINGERPRINT_BITS * (1 - threshold))
+        bands = self.max_distance + 1
+        band_size = -(-FINGERPRINT_BITS // bands)  # ceil
+        self.bands: List[Tuple[int, int]] = [
+            (start, min(band_size, FINGERPRINT_BITS - start)) for start in range(0, FINGERPRINT_BITS, band_size)
+        ]
+        self.fingerprints: List[int] = []
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        return [(start, fingerprint >> start & ((1 << size) - 1)) for start, size in self.bands]
+
+    def find(self, fingerprint: int) -> int | None:
+        """
+        Return the id of the closest indexed fingerprint within max_distance, if any.
+        """
+        best_id, best_distance = None, self.max_distance + 1
+        seen = set()
+        for key in self._band_keys(fingerprint):
+            for fingerprint_id in self.buckets.get(key, []):
+                if fingerprint_id in seen:
+                    continue
+                seen.add(fingerprint_id)
+                distance = (self.fingerprints[fingerprint_id] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best_id, best_distance = fingerprint_id, distance
+        return best_id
+
+    def add(self, fingerprint: int) -> int:
+        """
+        Index the given fingerprint and return its id.
+        """
+        fingerprint_id = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        for key in self._band_keys(fingerprint):
+            self.buckets[key].append(fingerprint_id)
+        return fingerprint_id
@@ -1,13 +1,16 @@
 from typing import List, Dict
 from bs4 import BeautifulSoup
 
+from src.discovery.classes.blob_store import BlobStore
+
 
 class Page:
     def __init__(
         self,
         uri: str | None,
         title: str | None,
-        original_soup: BeautifulSoup,
+        page_source_key: str,
+        page_sources: BlobStore,
         summary: str,
         outlinks: List[str],
         interaction_names: List[str],
@@ -15,8 +18,21 @@ class Page:
     ) -> None:
         self.uri = uri
         self.title = title
-        self.original_soup = original_soup
+        # the page source is kept compressed in the blob store of the site info (see SiteInfo.page_sources)
+        self.page_source_key = page_source_key
+        self.page_sources = page_sources
         self.summary = summary
         self.outlinks = outlinks
         self.interaction_names = interaction_names
         self.apis_called = apis_called
+
+    @property
+    def page_source(self) -> str:
+        return self.page_sources.get(self.page_source_key)
+
+    @property
+    def original_soup(self) -> BeautifulSoup:
+        """
+        The page source, parsed on every access (the soup is not kept in memory).
+        """
+        return BeautifulSoup(self.page_source, "html.parser")
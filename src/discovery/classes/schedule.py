@@ -1,14 +1,52 @@
-from typing import List, Tuple
-from urllib.parse import urlparse
+import random
+from typing import Dict, List, Set, Tuple
+from urllib.parse import parse_qsl, urlparse
+from src.discovery.api_templating import classify_segment
 from src.log import logger
 
 
+def uri_template(uri: str) -> str:
+    """
+    Return the template of the given URI, from the shape of its path segments and its query keys.
+
+    /item/42?id=7&view=full -> /item/<id>?id&view
+    """
+    parsed = urlparse(uri)
+    segments = []
+    for segment in parsed.path.split("/"):
+        kind = classify_segment(segment)
+        segments.append(segment if kind == "static" else "<id>" if kind == "id" else "<slug>")
+    query_keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    return "/".join(segments) + ("?" + "&".join(query_keys) if query_keys else "")
+
+
 class Schedule:
-    def __init__(self, target: str, initial_path: str) -> None:
+    def __init__(
+        self,
+        target: str,
+        initial_path: str,
+        template_quota: int | None = None,
+        template_sample_rate: float = 0.0,
+        template_novelty_bonus: int = 0,
+        template_sample_seed: int | None = None,
+    ) -> None:
         self.target = target
 
         self.uris_todo: List[str] = [initial_path]
         self.uris_visited: List[str] = []
+        self.uris_seen: Set[str] = {initial_path}
+        # Started but not finished, requeued when resuming from a checkpoint
+        self.uris_in_progress: List[str] = []
+        self.interactions_in_progress: List[Tuple[str, int]] = []
+
+        # Per-template visit budget (None: every URI is queued)
+        self.template_quota = template_quota
+        self.template_sample_rate = template_sample_rate
+        self.template_novelty_bonus = template_novelty_bonus
+        self.rng = random.Random(template_sample_seed)
+        self.template_budget: Dict[str, int] = {}
+        self.template_queued: Dict[str, int] = {uri_template(initial_path): 1}
+        self.uris_deferred: Dict[str, List[str]] = {}
 
         self.interactions_todo: List[Tuple[str, int]] = []
         self.interactions_visited: List[Tuple[str, int]] = []
@@ -17,10 +55,15 @@ class Schedule:
         if self.uris_todo:
             next_path = self.uris_todo.pop(0)
             self.uris_visited.append(next_path)
+            self.uris_in_progress.append(next_path)
             return next_path
         else:
             return None
 
+    def finish_uri(self, path: str) -> None:
+        if path in self.uris_in_progress:
+            self.uris_in_progress.remove(path)
+
     def add_uris_to_todo(self, paths: List[str]) -> None:
         for path in paths:
             # if path starts with http:// or https://, make sure its in scope (same domain)
@@ -29,17 +72,68 @@ class Schedule:
                     logger.debug(f"Skipping outlink {path} as it is out of scope")
                     continue
 
-            if path not in self.uris_todo and path not in self.uris_visited:
-                self.uris_todo.append(path)
+            if path in self.uris_seen:
+                continue
+            self.uris_seen.add(path)
+            self._queue_or_defer(path)
+
+    def _queue_or_defer(self, path: str) -> None:
+        """
+        Queue the path if its template has budget left (or it is randomly sampled), defer it otherwise.
+        """
+        template = uri_template(path)
+        queued = self.template_queued.get(template, 0)
+        if self.template_quota is None or queued < self.template_budget.get(template, self.template_quota):
+            self.template_queued[template] = queued + 1
+            self.uris_todo.append(path)
+        elif self.rng.random() < self.template_sample_rate:
+            # random samples do not use up the budget
+            self.uris_todo.append(path)
+        else:
+            logger.debug(f"Deferring {path}, template {template} is over budget")
+            self.uris_deferred.setdefault(template, []).append(path)
+
+    def report_uri_result(self, path: str, novel: bool) -> None:
+        """
+        Report whether visiting the path found new interactions or APIs. Templates producing
+        novel results get more budget, releasing some of their deferred URIs.
+        """
+        if self.template_quota is None or not novel:
+            return
+        template = uri_template(path)
+        budget = self.template_budget.get(template, self.template_quota) + self.template_novelty_bonus
+        self.template_budget[template] = budget
+        deferred = self.uris_deferred.get(template, [])
+        while deferred and self.template_queued.get(template, 0) < budget:
+            self.uris_todo.append(deferred.pop(0))
+            self.template_queued[template] = self.template_queued.get(template, 0) + 1
 
     def next_interaction(self) -> Tuple[str, int]:
         if self.interactions_todo:
             next_interaction = self.interactions_todo.pop(0)
             self.interactions_visited.append(next_interaction)
+            self.interactions_in_progress.append(next_interaction)
             return next_interaction
         else:
             return None
 
+    def finish_interaction(self, interaction: Tuple[str, int]) -> None:
+        if interaction in self.interactions_in_progress:
+            self.interactions_in_progress.remove(interaction)
+
+    def requeue_in_progress(self) -> None:
+        """
+        Move the URIs and interactions that were not finished back to the front of the todo lists.
+        """
+        for path in reversed(self.uris_in_progress):
+            self.uris_visited.remove(path)
+            self.uris_todo.insert(0, path)
+        for interaction in reversed(self.interactions_in_progress):
+            self.interactions_visited.remove(interaction)
+            self.interactions_todo.insert(0, interaction)
+        self.uris_in_progress = []
+        self.interactions_in_progress = []
+
     def add_interactions_to_todo(self, interactions: List[str]) -> None:
         for interaction in interactions:
             if (
@@ -51,5 +145,6 @@ class Schedule:
     def debug_print_schedule(self) -> None:
         logger.debug(f"URIs Todo: {self.uris_todo}")
         logger.debug(f"URIs Visited: {self.uris_visited}")
+        logger.debug(f"URIs Deferred: {sum(len(uris) for uris in self.uris_deferred.values())}")
         logger.debug(f"Interactions Todo: {self.interactions_todo}")
         logger.debug(f"Interactions Visited: {self.interactions_visited}")
\ No newline at end of file
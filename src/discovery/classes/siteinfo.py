@@ -1,40 +1,88 @@
+import hashlib
 import json
+from urllib.parse import parse_qsl
 from src.discovery.llm.model_classes import ApiModel, InteractionModel
 from src.discovery.classes.interaction import Interaction
 from src.discovery.classes.page import Page
 from src.discovery.classes.api import Api
+from src.discovery.classes.blob_store import BlobStore
+from src.discovery.classes.fingerprint import FingerprintIndex, simhash, skeleton_shingles
 from src.log import logger
 from bs4 import BeautifulSoup
-from typing import List, Dict, Tuple
+from typing import List, Dict, Set, Tuple
 
 
 class SiteInfo:
-    def __init__(self, target: str) -> None:
+    def __init__(
+        self, target: str, near_duplicate_threshold: float | None = None, near_duplicate_samples: int = 1
+    ) -> None:
         self.target = target
 
         self.pages: List[Page] = []
-        self.pages_hashes: List[int] = []
+        # Compressed page sources, shared by all pages (identical snapshots are stored once)
+        self.page_sources = BlobStore()
+        self.pages_hashes: Set[str] = set()
+        # Near-duplicate detection on the DOM skeleton (None: only exact duplicates are skipped)
+        self.page_fingerprints = (
+            FingerprintIndex(near_duplicate_threshold) if near_duplicate_threshold is not None else None
+        )
+        self.near_duplicate_samples = near_duplicate_samples
+        self.template_page_counts: Dict[int, int] = {}
+        # Pages checked but not added yet, by URI (hash and template), discarded when resuming from a checkpoint
+        self.pending_pages: Dict[str, Tuple[str, int | None]] = {}
 
         self.apis: List[Api] = []
 
         self.interactions: List[Interaction] = []
 
-    def check_if_visited(self, soup: BeautifulSoup) -> bool:
-        page_hash = hash(soup)
+        # Indexes of the lists above, kept up to date by the add_* methods
+        self._apis_index: Dict[Tuple[str, str], Api] = {}  # (method, path) -> api
+        self._interactions_index: Dict[str, Interaction] = {}  # name -> interaction
+        self._interaction_uris: Dict[str, List[str]] = {}  # interaction name -> uris of the pages with it
+
+    def check_if_visited(self, soup: BeautifulSoup, uri: str | None = None) -> bool:
+        """
+        Check if the page was visited: either the same content was seen before, or the page is a
+        near-duplicate of a template that was already sampled near_duplicate_samples times.
+        """
+        page_hash = hashlib.sha1(str(soup).encode()).hexdigest()
         if page_hash in self.pages_hashes:
             return True
-        else:
-            self.pages_hashes.append(page_hash)
-            return False
+        self.pages_hashes.add(page_hash)
+        template_id = None
+        if self.page_fingerprints is not None:
+            fingerprint = simhash(skeleton_shingles(soup))
+            template_id = self.page_fingerprints.find(fingerprint)
+            if template_id is None:
+                template_id = self.page_fingerprints.add(fingerprint)
+                self.template_page_counts[template_id] = 1
+            elif self.template_page_counts[template_id] >= self.near_duplicate_samples:
+                logger.debug(f"Skipping near-duplicate page of template {template_id}")
+                return True
+            else:
+                self.template_page_counts[template_id] += 1
+        if uri is not None:
+            self.pending_pages[uri] = (page_hash, template_id)
+        return False
+
+    def discard_pending_pages(self) -> None:
+        """
+        Forget the pages that were checked but never added, so they are not skipped when visited again.
+        """
+        for page_hash, template_id in self.pending_pages.values():
+            self.pages_hashes.discard(page_hash)
+            if template_id is not None:
+                self.template_page_counts[template_id] -= 1
+        self.pending_pages = {}
 
     def add_page(self, page: Page) -> None:
         self.pages.append(page)
+        self.pending_pages.pop(page.uri, None)
+        for interaction_name in dict.fromkeys(page.interaction_names):
+            self._interaction_uris.setdefault(interaction_name, []).append(page.uri)
 
     def get_api(self, method: str, path: str) -> Api:
-        for api in self.apis:
-            if api.method == method and api.path == path:
-                return api
-        return None
+        return self._apis_index.get((method, path))
 
     def add_apis(self, apis_model: List[ApiModel]) -> List[str]:
         """
@@ -49,21 +97,17 @@ class SiteInfo:
             if found is None:
                 api_obj = Api(api.method, api.path)
                 self.apis.append(api_obj)
+                self._apis_index[(api.method, api.path)] = api_obj
                 found = api_obj
             added_apis.append(f"{found.method} {found.path}")
             # Add the url parameters
             logger.debug(f"Adding API: {found.method} {found.path}")
             logger.debug(f"Api: {api}")
             # Adding url parameters
-            if (
-                api.query_string is not None
-                and api.query_string != ""
-                and "=" in api.query_string
-            ):
-                split_qs = api.query_string.split("&")
-                for qs in split_qs:
-                    key, value = qs.split("=")
-                    if key not in found.params:
+            if api.query_string:
+                # flags without a value (?debug) and values containing "=" are kept
+                for key, value in parse_qsl(api.query_string, keep_blank_values=True):
+                    if found.get_param(key) is None:
                         found.add_param(key, "url")
                     found.get_param(key).add_observed_value(value)
             # Adding body parameters (postData)
@@ -71,15 +115,15 @@ class SiteInfo:
                 content_type = api.headers["Content-Type"]
                 # TODO: make sure this works for url encoded and json and form and etc
                 if "application/json" in content_type:
-                    if api.postData != "":
+                    if api.postData:
                         for key, value in api.postData.items():
-                            if key not in found.params:
+                            if found.get_param(key) is None:
                                 found.add_param(key, "body")
                             found.get_param(key).add_observed_value(value)
             # Adding URL Path Parameters
             if api.url_path_params is not None:
                 for key, value in api.url_path_params.items():
-                    if key not in found.params:
+                    if found.get_param(key) is None:
                         found.add_param(key, "url_path")
                     found.get_param(key).add_observed_value(value)
 
@@ -97,12 +141,7 @@ class SiteInfo:
         for interaction in interactions:
             interaction_names.append(interaction.name)
             # check if the interaction already exists in self.interactions
-            found = False
-            for i in self.interactions:
-                if i.name == interaction.name:
-                    found = True
-                    break
-            if not found:
+            if interaction.name not in self._interactions_index:
                 new_interactions_added = True
                 interaction_obj = Interaction(
                     interaction.name,
@@ -110,17 +149,11 @@ class SiteInfo:
                     interaction.input_fields,
                 )
                 self.interactions.append(interaction_obj)
+                self._interactions_index[interaction.name] = interaction_obj
         return interaction_names, new_interactions_added
     
     def get_interaction(self, interaction_name: str) -> Interaction:
-        for interaction in self.interactions:
-            if interaction.name == interaction_name:
-                return interaction
-        return None
+        return self._interactions_index.get(interaction_name)
 
     def get_uris_with_interaction(self, interaction_name: str) -> List[str]:
-        uris = []
-        for page in self.pages:
-            if interaction_name in page.interaction_names:
-                uris.append(page.uri)
-        return uris
+        return list(self._interaction_uris.get(interaction_name, []))
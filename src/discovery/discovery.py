@@ -1,10 +1,18 @@
 import json
-import time
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import List, Tuple
 
 from bs4 import BeautifulSoup
 
 from config import Config
-from src.pretty_log import DiscoveryLog, RankerLog
+from src.pretty_log import BrowserPoolLog, DiscoveryLog, RankerLog
+from src.discovery.api_templating import extract_apis
+from src.discovery.browser.pool import BrowserPool
+from src.discovery.browser.network import get_network_capture
+from src.discovery.browser.readiness import wait_until_ready
+from src.discovery.browser.snapshot import get_snapshot
+from src.discovery.checkpoint import Checkpointer, load_checkpoint
 from src.discovery.classes.schedule import Schedule
 
 from src.discovery.interaction_agent.agent import InteractionAgent
@@ -12,7 +20,6 @@ from src.discovery.llm.ranker import llm_rank_interactions
 from src.discovery.classes.siteinfo import SiteInfo
 from src.discovery.classes.page import Page
 from src.discovery.utils import (
-    filter_html,
     parse_apis,
     parse_links,
 )
@@ -25,157 +32,377 @@ from rich.text import Text
 from rich.live import Live
 
 
+def discover_page(
+    cf: Config,
+    driver,
+    uri: str,
+    si: SiteInfo,
+    schedule: Schedule,
+    lock: threading.RLock,
+    llm_summarizer: LLM_Summarizer,
+    llm_interactionparser: LLM_InteractionParser,
+    llm_page_request_parser: LLM_ApiParser,
+    discovery_log: DiscoveryLog,
+) -> Tuple[List[str], bool] | None:
+    """
+    Discover a single URI with the given driver.
+
+    Returns the interaction names found on the page and whether any of them are new,
+    or None if the page could not be loaded or was already visited (its outlinks are still queued).
+    """
+    # Load the page
+    discovery_log.update_status("Loading Page", "running")
+    get_network_capture(driver).reset()
+    try:
+        driver.get(f"{cf.target}{uri}")
+    except Exception as e:
+        logger.error(f"Error loading page: {e}")
+        discovery_log.update_status("Loading Page", "skipped")
+        print(Text(f"Error loading page: {uri}", style="bold red"))
+        return None
+    wait_until_ready(cf, driver)
+
+    snapshot = get_snapshot(driver)
+    soup = snapshot.filtered_soup
+    discovery_log.update_status("Loading Page", "done")
+    with lock:
+        visited = si.check_if_visited(soup, uri)
+    if visited:
+        discovery_log.update_status("Discovering APIs", "skipped")
+        discovery_log.update_status("Discovering Interactions", "skipped")
+        discovery_log.update_status("Summarizing Page", "skipped")
+        # only the LLM stages are skipped, the links of the page are still followed
+        with lock:
+            schedule.add_uris_to_todo(parse_links(snapshot.soup))
+        return None
+
+    # Parse the page requests
+    p_reqs = parse_apis(driver=driver, target=cf.target, uri=uri, filtered=True)
+
+    # The LLM stages are independent of each other, so run them concurrently
+    def run_stage(task: str, func, *args):
+        discovery_log.update_status(task, "running")
+        result = func(*args)
+        discovery_log.update_status(task, "done")
+        return result
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        apis_future = (
+            executor.submit(
+                run_stage,
+                "Discovering APIs",
+                extract_apis,
+                p_reqs,
+                cf.target,
+                llm_page_request_parser,
+                cf.rule_based_api_parsing,
+            )
+            if len(p_reqs) > 0
+            else None
+        )
+        interactions_future = executor.submit(
+            run_stage,
+            "Discovering Interactions",
+            llm_interactionparser.parse_interactions_chunked,
+            snapshot.render_chunks(cf.page_representation["interaction_parser"], cf.interaction_chunk_tokens),
+        )
+        summary_future = executor.submit(
+            run_stage,
+            "Summarizing Page",
+            llm_summarizer.create_summary,
+            snapshot.render(cf.page_representation["summarizer"]),
+        )
+
+        if apis_future is None:
+            discovery_log.update_status("Discovering APIs", "done")
+        apis = apis_future.result() if apis_future is not None else []
+        interactions = interactions_future.result()
+        summary = summary_future.result()
+
+    with lock:
+        apis_known = len(si.apis)
+        apis_called_passive = si.add_apis(apis) if len(apis) > 0 else []
+        new_apis_added = len(si.apis) > apis_known
+        interaction_names, new_interactions_added = si.add_interactions(interactions)
+
+    logger.debug(f"Found Interactions: {", ".join(interaction_names)}")
+
+    # Create the page object
+    # path, query_string = uri.split("?") if "?" in uri else (uri, None)
+    page = Page(
+        uri=uri,
+        title=soup.title.string if soup.title else None,
+        page_source_key=si.page_sources.put(snapshot.page_source),
+        page_sources=si.page_sources,
+        summary=summary,
+        outlinks=parse_links(snapshot.soup),
+        interaction_names=interaction_names,
+        apis_called=apis_called_passive,
+    )
+
+    with lock:
+        schedule.report_uri_result(uri, new_interactions_added or new_apis_added)
+        schedule.add_uris_to_todo(page.outlinks)
+        schedule.add_interactions_to_todo(page.interaction_names)
+        si.add_page(page)
+
+    return interaction_names, new_interactions_added
+
+
+def crawl_uris(
+    cf: Config,
+    pool: BrowserPool,
+    si: SiteInfo,
+    schedule: Schedule,
+    llm_summarizer: LLM_Summarizer,
+    llm_interactionparser: LLM_InteractionParser,
+    llm_page_request_parser: LLM_ApiParser,
+    checkpointer: Checkpointer | None = None,
+) -> bool:
+    """
+    Discover all scheduled URIs with every browser of the pool in parallel, until no URIs are left.
+
+    Returns whether new interactions were added.
+    """
+    print(Text(f"\nDiscovering URIs with {pool.size} browsers", style="bold green"))
+    pool_log = BrowserPoolLog(pool.size)
+    # Guards si and schedule, workers wait on it while other workers may still add new URIs
+    condition = threading.Condition(threading.RLock())
+    # set when the crawl is interrupted (Ctrl-C is only raised in the main thread), workers stop after their page
+    stop = threading.Event()
+    active_workers = 0
+    new_interactions_added = False
+
+    def worker(worker_index: int) -> None:
+        nonlocal active_workers, new_interactions_added
+        with pool.lease() as driver:
+            while True:
+                with condition:
+                    while not schedule.uris_todo and active_workers > 0 and not stop.is_set():
+                        condition.wait()
+                    if stop.is_set() or not schedule.uris_todo:
+                        pool_log.update_worker(worker_index, None, None)
+                        return
+                    uri = schedule.next_uri()
+                    active_workers += 1
+                logger.debug(f"Discovering URI: {uri} (browser {worker_index + 1})")
+                discovery_log = DiscoveryLog()
+                pool_log.update_worker(worker_index, uri, discovery_log)
+                try:
+                    result = discover_page(
+                        cf,
+                        driver,
+                        uri,
+                        si,
+                        schedule,
+                        condition,
+                        llm_summarizer,
+                        llm_interactionparser,
+                        llm_page_request_parser,
+                        discovery_log,
+                    )
+                    if result is not None:
+                        interaction_names, new_interactions = result
+                        print(Text(f"Found Interactions on {uri}: {", ".join(interaction_names)}"))
+                        if new_interactions:
+                            with condition:
+                                new_interactions_added = True
+                except Exception as e:
+                    logger.error(f"Error discovering {uri}: {e}")
+                    print(Text(f"Error discovering page: {uri}", style="bold red"))
+                finally:
+                    # an interrupted URI stays in progress, the checkpoint reschedules it
+                    with condition:
+                        active_workers -= 1
+                        condition.notify_all()
+                with condition:
+                    schedule.finish_uri(uri)
+                    if checkpointer is not None:
+                        checkpointer.maybe_save()
+
+    with Live(get_renderable=pool_log.render, refresh_per_second=10):
+        executor = ThreadPoolExecutor(max_workers=pool.size)
+        try:
+            futures = [executor.submit(worker, i) for i in range(pool.size)]
+            wait(futures, return_when=FIRST_EXCEPTION)
+            for future in futures:
+                future.result()
+        except BaseException:
+            # interrupted (or a worker failed): stop taking URIs, discover() saves the checkpoint once the
+            # workers finished their current page
+            stop.set()
+            with condition:
+                condition.notify_all()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+    return new_interactions_added
+
+
 def discover(cf: Config) -> SiteInfo:
     """
     Discover the given URL.
     """
     print(Text("Starting discovery", style="bold green"))
     logger.debug("Starting discovery")
-    si = SiteInfo(cf.target)
-    schedule = Schedule(cf.target, cf.initial_path)
+    si = SiteInfo(cf.target, cf.near_duplicate_threshold, cf.near_duplicate_samples)
+    schedule = Schedule(
+        cf.target,
+        cf.initial_path,
+        cf.template_quota,
+        cf.template_sample_rate,
+        cf.template_novelty_bonus,
+        cf.template_sample_seed,
+    )
 
     llm_summarizer = LLM_Summarizer(cf)
     llm_interactionparser = LLM_InteractionParser(cf)
     llm_page_request_parser = LLM_ApiParser(cf)
 
-    interaction_agent = InteractionAgent(cf, llm_page_request_parser)
+    pool = BrowserPool(cf, cf.browser_workers)
+    interaction_agent = InteractionAgent(cf, llm_page_request_parser, pool)
+    lock = threading.RLock()
 
     rerank_required = True
     interaction_context = []
 
-    while schedule.uris_todo or schedule.interactions_todo:
-        schedule.debug_print_schedule()
-        if schedule.uris_todo:
-            uri = schedule.next_uri()
-            logger.debug(f"Discovering URI: {uri}")
-            print(Text(f"\nDiscovering URI: {uri}", style="bold green"))
-            discovery_log = DiscoveryLog()
-            with Live(refresh_per_second=10) as live:
-                # Load the page
-                discovery_log.update_status("Loading Page", "running")
-                live.update(discovery_log.render())
-                try:
-                    cf.driver.get(f"{cf.target}{uri}")
-                except Exception as e:
-                    logger.error(f"Error loading page: {e}")
-                    discovery_log.update_status("Loading Page", "skipped")
-                    live.update(discovery_log.render())
-                    print(Text(f"Error loading page: {uri}", style="bold red"))
-                    continue
-                time.sleep(cf.selenium_rate)
-
-                original_soup = BeautifulSoup(cf.driver.page_source, "html.parser")
-                soup = filter_html(original_soup)
-                discovery_log.update_status("Loading Page", "done")
-                if si.check_if_visited(soup):
-                    discovery_log.update_status("Discovering APIs", "skipped")
-                    discovery_log.update_status("Discovering Interactions", "skipped")
-                    discovery_log.update_status("Summarizing Page", "skipped")
-                    live.update(discovery_log.render())
-                    continue
+    if cf.resume:
+        state = load_checkpoint(cf.checkpoint_path, cf.target)
+        si = state["si"]
+        schedule = state["schedule"]
+        interaction_context = state["interaction_context"]
+        rerank_required = state["rerank_required"]
+        llm_summarizer.memory = state["memories"]["summarizer"]
+        llm_interactionparser.memory = state["memories"]["interaction_parser"]
+        llm_page_request_parser.memory = state["memories"]["api_parser"]
+        # pages and interactions that were interrupted are discovered again
+        si.discard_pending_pages()
+        schedule.requeue_in_progress()
+        print(Text(f"Resuming from {cf.checkpoint_path}: {len(si.pages)} pages discovered", style="bold green"))
 
-                # Parse the page requests
-                discovery_log.update_status("Discovering APIs", "running")
-                live.update(discovery_log.render())
-                p_reqs = parse_apis(driver=cf.driver, target=cf.target, uri=uri, filtered=True)
+    def checkpoint_state() -> dict:
+        return {
+            "si": si,
+            "schedule": schedule,
+            "interaction_context": interaction_context,
+            "rerank_required": rerank_required,
+            "memories": {
+                "summarizer": llm_summarizer.memory,
+                "interaction_parser": llm_interactionparser.memory,
+                "api_parser": llm_page_request_parser.memory,
+            },
+        }
 
-                apis_called_passive = (
-                    si.add_apis(llm_page_request_parser.parse_apis(json.dumps(p_reqs, indent=4)))
-                    if len(p_reqs) > 0
-                    else []
-                )
-                discovery_log.update_status("Discovering APIs", "done")
+    checkpointer = Checkpointer(cf.checkpoint_path, cf.checkpoint_interval, checkpoint_state)
 
-                # Parse the interactions
-                discovery_log.update_status("Discovering Interactions", "running")
-                live.update(discovery_log.render())
-                interactions = llm_interactionparser.parse_interactions(soup)
-                interaction_names, new_interactions_added = si.add_interactions(interactions)
+    try:
+        while schedule.uris_todo or schedule.interactions_todo:
+            checkpointer.maybe_save()
+            schedule.debug_print_schedule()
+            if schedule.uris_todo and pool.size > 1:
+                if crawl_uris(
+                    cf,
+                    pool,
+                    si,
+                    schedule,
+                    llm_summarizer,
+                    llm_interactionparser,
+                    llm_page_request_parser,
+                    checkpointer,
+                ):
+                    rerank_required = True
+            elif schedule.uris_todo:
+                uri = schedule.next_uri()
+                logger.debug(f"Discovering URI: {uri}")
+                print(Text(f"\nDiscovering URI: {uri}", style="bold green"))
+                discovery_log = DiscoveryLog()
+                with Live(get_renderable=discovery_log.render, refresh_per_second=10):
+                    result = discover_page(
+                        cf,
+                        cf.driver,
+                        uri,
+                        si,
+                        schedule,
+                        lock,
+                        llm_summarizer,
+                        llm_interactionparser,
+                        llm_page_request_parser,
+                        discovery_log,
+                    )
+                schedule.finish_uri(uri)
+                if result is None:
+                    continue
+                interaction_names, new_interactions_added = result
                 if new_interactions_added:
                     rerank_required = True
+                print(Text(f"Found Interactions: {", ".join(interaction_names)}"))
 
-                logger.debug(f"Found Interactions: {", ".join(interaction_names)}")
-                discovery_log.update_status("Discovering Interactions", "done")
-
-                # Create the summary
-                discovery_log.update_status("Summarizing Page", "running")
-                live.update(discovery_log.render())
-                summary = llm_summarizer.create_summary(soup)
-                discovery_log.update_status("Summarizing Page", "done")
-                live.update(discovery_log.render())
+            elif schedule.interactions_todo:
+                if rerank_required:
+                    ranker_log = RankerLog()
+                    with Live(refresh_per_second=10) as live:
+                        print(Text("\nRanking Interactions", style="bold green"))
+                        ranker_log.update_status("running")
+                        live.update(ranker_log.render())
+                        interaction_names = [interaction for interaction, _ in schedule.interactions_todo]
+                        ranked_interactions = llm_rank_interactions(cf, interaction_names)
+                        logger.debug(f"Re-Ranked Interactions: {ranked_interactions}")
+                        schedule.interactions_todo = ranked_interactions
+                        rerank_required = False
+                        ranker_log.update_status("done")
+                        live.update(ranker_log.render())
+                interaction_name, interaction_limit = schedule.next_interaction()
+                if interaction_limit <= 0:
+                    schedule.finish_interaction((interaction_name, interaction_limit))
+                    logger.debug(f"Skipping interaction {interaction_name} as limit is 0")
+                    continue
 
-                # Create the page object
-                # path, query_string = uri.split("?") if "?" in uri else (uri, None)
-                page = Page(
+                interaction = si.get_interaction(interaction_name)
+                logger.debug(f"Discovering interaction: {interaction_name}")
+                print(Text(f"\nDiscovering interaction: {interaction_name}", style="bold green"))
+                uri = si.get_uris_with_interaction(interaction_name)[0]
+                # behaviour, all_p_reqs, all_paths, new_soup = interaction_agent.interact(
+                #     uri=uri, interaction=json.dumps(interaction.to_dict())
+                # )
+                test_report, all_p_reqs_parsed, all_paths, new_interaction_context = interaction_agent.interact(
                     uri=uri,
-                    title=soup.title.string if soup.title else None,
-                    original_soup=original_soup,
-                    summary=summary,
-                    outlinks=parse_links(original_soup),
-                    interaction_names=interaction_names,
-                    apis_called=apis_called_passive,
+                    interaction=json.dumps(interaction.to_dict()),
+                    limit=str(interaction_limit),
+                    interaction_context=interaction_context,
                 )
+                interaction_context += new_interaction_context
 
-                schedule.add_uris_to_todo(page.outlinks)
-                schedule.add_interactions_to_todo(page.interaction_names)
-
-                si.add_page(page)
-                time.sleep(cf.selenium_rate)
-            print(Text(f"Found Interactions: {", ".join(interaction_names)}"))
-
-        elif schedule.interactions_todo:
-            if rerank_required:
-                ranker_log = RankerLog()
-                with Live(refresh_per_second=10) as live:
-                    print(Text("\nRanking Interactions", style="bold green"))
-                    ranker_log.update_status("running")
-                    live.update(ranker_log.render())
-                    interaction_names = [interaction for interaction, _ in schedule.interactions_todo]
-                    ranked_interactions = llm_rank_interactions(cf, interaction_names)
-                    logger.debug(f"Re-Ranked Interactions: {ranked_interactions}")
-                    schedule.interactions_todo = ranked_interactions
-                    rerank_required = False
-                    ranker_log.update_status("done")
-                    live.update(ranker_log.render())
-            interaction_name, interaction_limit = schedule.next_interaction()
-            if interaction_limit <= 0:
-                logger.debug(f"Skipping interaction {interaction_name} as limit is 0")
-                continue
-
-            interaction = si.get_interaction(interaction_name)
-            logger.debug(f"Discovering interaction: {interaction_name}")
-            print(Text(f"\nDiscovering interaction: {interaction_name}", style="bold green"))
-            uri = si.get_uris_with_interaction(interaction_name)[0]
-            # behaviour, all_p_reqs, all_paths, new_soup = interaction_agent.interact(
-            #     uri=uri, interaction=json.dumps(interaction.to_dict())
-            # )
-            test_report, all_p_reqs_parsed, all_paths, new_interaction_context = interaction_agent.interact(
-                uri=uri,
-                interaction=json.dumps(interaction.to_dict()),
-                limit=str(interaction_limit),
-                interaction_context=interaction_context,
-            )
-            interaction_context += new_interaction_context
-
-            apis_called_interaction = si.add_apis(all_p_reqs_parsed) if len(all_p_reqs_parsed) > 0 else []
-            si.add_apis(all_p_reqs_parsed)
-
-            interaction.test_report = test_report
-            interaction.apis_called = apis_called_interaction
-            interaction.tested = True
+                apis_called_interaction = si.add_apis(all_p_reqs_parsed) if len(all_p_reqs_parsed) > 0 else []
+                si.add_apis(all_p_reqs_parsed)
 
-            logger.debug(f"All paths: {all_paths}")
-            schedule.add_uris_to_todo(all_paths)  # Add the new paths to the schedule
+                interaction.test_report = test_report
+                interaction.apis_called = apis_called_interaction
+                interaction.tested = True
 
-            # TODO: handle this inside the agent (discover new interactions in same page with new soup)
-            # if new_soup:  # Parse interactions if the page has changed
-            #     interactions = llm_interactionparser.parse_interactions(soup) # signature has changed
-            #     interaction_names = si.add_interactions(interactions)
+                logger.debug(f"All paths: {all_paths}")
+                schedule.add_uris_to_todo(all_paths)  # Add the new paths to the schedule
+                schedule.finish_interaction((interaction_name, interaction_limit))
 
-            #     for interaction_name in interaction_names:
-            #         logger.debug(f"Found Interaction: {interaction_name}")
+                # TODO: handle this inside the agent (discover new interactions in same page with new soup)
+                # if new_soup:  # Parse interactions if the page has changed
+                #     interactions = llm_interactionparser.parse_interactions(soup) # signature has changed
+                #     interaction_names = si.add_interactions(interactions)
 
-            time.sleep(cf.selenium_rate)
+                #     for interaction_name in interaction_names:
+                #         logger.debug(f"Found Interaction: {interaction_name}")
+        checkpointer.save()
+    except BaseException:
+        # Ctrl-C or a crash: keep the work done since the last checkpoint,
+        # the pages and interactions in progress are discovered again on resume
+        try:
+            checkpointer.save()
+            print(Text(f"\nDiscovery interrupted, continue with --resume ({cf.checkpoint_path})", style="bold yellow"))
+        except Exception as e:
+            logger.error(f"Could not save checkpoint: {e}")
+        raise
+    finally:
+        pool.quit()
 
     logger.debug("Discovery complete")
 
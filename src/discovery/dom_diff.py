@@ -0,0 +1,175 @@
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import Comment, PageElement
+
+SNIPPET_LENGTH = 200
+
+
+class DomDiff:
+    """
+    Structural diff of two DOM trees.
+
+    Unchanged subtrees are matched by a hash of their content and skipped, the remaining children
+    are aligned by their tag name and id (or name) and compared recursively, so indentation or
+    unrelated siblings never show up as changes. Every change is one line with a compact XPath-like path:
+
+        + /html/body/main/p#result: <p id="result">Saved</p>
+        - /html/body/main/form#form-0/input[2]: <input name="amount"/>
+        ~ /html/body/main/h1/text(): 'Old title' -> 'New title'
+        ~ /html/body/main/button @class: 'btn' -> 'btn active'
+    """
+
+    def __init__(self, max_changes: int = 50) -> None:
+        self.max_changes = max_changes
+        self.changes: List[str] = []
+        self.omitted = 0
+        self._signatures: Dict[int, int] = {}
+
+    def _add(self, change: str) -> None:
+        if len(self.changes) < self.max_changes:
+            self.changes.append(change)
+        else:
+            self.omitted += 1
+
+    @staticmethod
+    def _children(tag: Tag) -> List[PageElement]:
+        return [
+            child
+            for child in tag.children
+            if isinstance(child, Tag)
+            or (isinstance(child, NavigableString) and not isinstance(child, Comment) and child.strip())
+        ]
+
+    @staticmethod
+    def _key(node: PageElement) -> Tuple[str, str | None]:
+        if isinstance(node, Tag):
+            return node.name, node.get("id") or node.get("name")
+        return "text()", None
+
+    @staticmethod
+    def _snippet(node: PageElement) -> str:
+        text = " ".join(str(node).split())
+        return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH] + "..."
+
+    @staticmethod
+    def _child_paths(path: str, children: List[PageElement]) -> List[str]:
+        """
+        Paths of the given children: name#id, or name[n] if there are several siblings with that name.
+        """
+        counts = {}
+        for child in children:
+            name, _ = DomDiff._key(child)
+            counts[name] = counts.get(name, 0) + 1
+        seen = {}
+        paths = []
+        for child in children:
+            name, _ = DomDiff._key(child)
+            seen[name] = seen.get(name, 0) + 1
+            if isinstance(child, Tag) and child.get("id"):
+                paths.append(f"{path}/{name}#{child['id']}")
+            elif counts[name] > 1:
+                paths.append(f"{path}/{name}[{seen[name]}]")
+            else:
+                paths.append(f"{path}/{name}")
+        return paths
+
+    def _signature(self, node: PageElement) -> int:
+        """
+        Hash of the whole subtree (ignoring whitespace), computed once per node.
+        """
+        signature = self._signatures.get(id(node))
+        if signature is None:
+            if isinstance(node, Tag):
+                attributes = tuple(
+                    (name, " ".join(value) if isinstance(value, list) else value) for name, value in node.attrs.items()
+                )
+                children = tuple(self._signature(child) for child in self._children(node))
+                signature = hash((node.name, attributes, children))
+            else:
+                signature = hash(node.strip())
+            self._signatures[id(node)] = signature
+        return signature
+
+    def compare(self, before: Tag, after: Tag, path: str = "") -> None:
+        # attributes
+        for attribute in sorted(set(before.attrs) | set(after.attrs)):
+            old, new = before.get(attribute), after.get(attribute)
+            if isinstance(old, list):
+                old = " ".join(old)
+            if isinstance(new, list):
+                new = " ".join(new)
+            if old != new:
+                self._add(f"~ {path or '/'} @{attribute}: {old!r} -> {new!r}")
+
+        children_before, children_after = self._children(before), self._children(after)
+        paths_before = self._child_paths(path, children_before)
+        paths_after = self._child_paths(path, children_after)
+
+        # unchanged subtrees are matched by their signature and skipped
+        signatures_before = [self._signature(child) for child in children_before]
+        signatures_after = [self._signature(child) for child in children_after]
+        if signatures_before == signatures_after:
+            return
+        matcher = SequenceMatcher(None, signatures_before, signatures_after, autojunk=False)
+        for operation, i1, i2, j1, j2 in matcher.get_opcodes():
+            if operation != "equal":
+                self._compare_changed(
+                    children_before[i1:i2], paths_before[i1:i2], children_after[j1:j2], paths_after[j1:j2]
+                )
+
+    def _compare_changed(
+        self,
+        children_before: List[PageElement],
+        paths_before: List[str],
+        children_after: List[PageElement],
+        paths_after: List[str],
+    ) -> None:
+        """
+        Align changed children by their key: matching ones are compared recursively, others were removed or inserted.
+        """
+        keys_before = [self._key(child) for child in children_before]
+        keys_after = [self._key(child) for child in children_after]
+        matcher = SequenceMatcher(None, keys_before, keys_after, autojunk=False)
+        for operation, i1, i2, j1, j2 in matcher.get_opcodes():
+            if operation == "equal":
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    node_before, node_after = children_before[i], children_after[j]
+                    if isinstance(node_before, Tag):
+                        self.compare(node_before, node_after, paths_after[j])
+                    else:
+                        self._add(f"~ {paths_after[j]}: {node_before.strip()!r} -> {node_after.strip()!r}")
+                continue
+            if len(self.changes) >= self.max_changes:
+                # over the cap, only count the changes
+                self.omitted += (i2 - i1) + (j2 - j1)
+                continue
+            for i in range(i1, i2):
+                self._add(f"- {paths_before[i]}: {self._snippet(children_before[i])}")
+            for j in range(j1, j2):
+                self._add(f"+ {paths_after[j]}: {self._snippet(children_after[j])}")
+
+    def render(self) -> str:
+        lines = list(self.changes)
+        if self.omitted > 0:
+            lines.append(f"... {self.omitted} more changes omitted")
+        return "\n".join(lines)
+
+
+def diff_soups(before: BeautifulSoup, after: BeautifulSoup, max_changes: int = 50) -> str:
+    """
+    Return the structural diff of the two soups, one change per line (empty if nothing changed).
+    """
+    dom_diff = DomDiff(max_changes)
+    dom_diff.compare(before, after)
+    return dom_diff.render()
+
+
+def diff_html(before: str, after: str, max_changes: int = 50) -> str:
+    """
+    Return the structural diff of the two HTML strings, see diff_soups.
+    """
+    if before == after:
+        return ""
+    return diff_soups(BeautifulSoup(before, "html.parser"), BeautifulSoup(after or "", "html.parser"), max_changes)
@@ -1,21 +1,21 @@
-from difflib import unified_diff
 import json
 import operator
 
 
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Literal, TypedDict, List, Annotated, Tuple
-from bs4 import BeautifulSoup
 from langgraph.graph import StateGraph, START, END
 from rich.live import Live
 
 # from pydantic import BaseModel
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain.agents.output_parsers import JSONAgentOutputParser
 
 from config import Config
+from src.discovery.api_templating import extract_apis
 from src.discovery.llm.api_parser import LLM_ApiParser
 from src.discovery.llm.model_classes import ApiModel
 from src.pretty_log import (
@@ -27,6 +27,17 @@ from src.pretty_log import (
 )
 from src.discovery.interaction_agent.classes import AnyInput, AnyOutput, ReplanModel, ReporterOutput
 
+from src.discovery.browser.network import get_network_capture
+from src.discovery.browser.pool import BrowserPool, get_session_state, reset_session
+from src.discovery.browser.readiness import wait_until_ready
+from src.discovery.browser.snapshot import get_snapshot
+from src.discovery.interaction_agent.budget import (
+    BudgetCallbackHandler,
+    TokenBudget,
+    stopped_by_limit,
+)
+from src.discovery.interaction_agent.executor_factory import ExecutorFactory
+from src.discovery.interaction_agent.snapshot_store import SnapshotStore
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.discovery.interaction_agent.tools.click import Click
 from src.discovery.interaction_agent.tools.fill_text_field import FillTextField
@@ -36,12 +47,12 @@ from src.discovery.interaction_agent.tools.get_element import GetElement
 from src.discovery.interaction_agent.tools.fill_date_field import FillDateField
 from src.discovery.interaction_agent.tools.get_outgoing_requests import GetOutgoingRequests
 from src.discovery.interaction_agent.tools.select_option import SelectOption
+from src.discovery.page_outline import page_formats
 from src.log import logger
-from src.discovery.utils import api_models_to_str, filter_html, format_context, format_steps, parse_apis
+from src.discovery.utils import api_models_to_str, format_context, format_steps, parse_apis
 from src.discovery.interaction_agent.prompts import (
     high_high_level_planner_prompt,
     high_level_planner_prompt,
-    react_agent_prompt,
     high_level_replanner_prompt,
     system_reporter_prompt,
     human_reporter_prompt,
@@ -59,6 +70,14 @@ from rich.text import Text
 from rich import print
 
 
+def add_tests(tests: List[TestModel], new_tests: List[TestModel]) -> List[TestModel]:
+    """
+    Reducer of the tests in the state: the steps return all tests they updated, keep each test once.
+    """
+    known = {id(test) for test in tests}
+    return tests + [test for test in new_tests if id(test) not in known]
+
+
 class State(TypedDict):
     uri: str
     interaction: str
@@ -66,21 +85,47 @@ class State(TypedDict):
     limit: str
     approaches: List[str]
     plans: List[PlanModel]
-    tests: Annotated[List[TestModel], operator.add]
+    tests: Annotated[List[TestModel], add_tests]
     report: str
     interaction_context: List[str]
     new_interaction_context: List[str]
     all_p_reqs_parsed: Annotated[List[ApiModel], operator.add]
     observed_uris: Annotated[List[str], operator.add]
+    session_state: dict
 
 
 class InteractionAgent:
-    def __init__(self, cf: Config, llm_page_request_parser: LLM_ApiParser) -> None:
+    def __init__(
+        self, cf: Config, llm_page_request_parser: LLM_ApiParser, pool: BrowserPool | None = None
+    ) -> None:
         self.cf = cf
         self.llm_page_request_parser = llm_page_request_parser
+        # the approaches of an interaction run concurrently in the sessions of the pool (only cf.driver without)
+        self.pool = pool
+        self.executors = ExecutorFactory(cf, self._init_tools)
+        # page states before and after the tests of the current interaction
+        self.snapshots = SnapshotStore(cf.page_diff_max_changes)
+        # tokens spent by the agent in the whole run and in the current interaction
+        self.total_budget = TokenBudget("total", cf.agent_total_token_budget)
+        self.interaction_budget = TokenBudget("interaction", cf.agent_interaction_token_budget)
         # self.tools = self._init_tools()
         self.app = self._init_app()
 
+    def _lease_driver(self):
+        if self.pool is None:
+            return nullcontext(self.cf.driver)
+        return self.pool.lease()
+
+    def _exhausted_budget(self) -> TokenBudget | None:
+        for budget in (self.interaction_budget, self.total_budget):
+            if budget.exhausted:
+                return budget
+        return None
+
+    def _usage_callbacks(self) -> List[BudgetCallbackHandler]:
+        # the planner and reporter calls count against the budgets, but are not skipped by them
+        return [BudgetCallbackHandler([self.interaction_budget, self.total_budget])]
+
     def _init_tools(self, context: ToolContext):
         return [
             Navigate(cf=self.cf, context=context),
@@ -100,10 +145,14 @@ class InteractionAgent:
             else:
                 return "executer"
 
-        high_high_level_planner = high_high_level_planner_prompt | self.cf.model.with_structured_output(
-            HighHighLevelPlan
-        )
-        high_level_planner = high_level_planner_prompt | self.cf.model.with_structured_output(PlanModel)
+        # the prompts describe the page representation the planners get
+        page_format = page_formats[self.cf.page_representation["interaction_agent"]]
+        high_high_level_planner = high_high_level_planner_prompt.partial(
+            page_format=page_format
+        ) | self.cf.model.with_structured_output(HighHighLevelPlan)
+        high_level_planner = high_level_planner_prompt.partial(
+            page_format=page_format
+        ) | self.cf.model.with_structured_output(PlanModel)
         high_level_replanner = high_level_replanner_prompt | self.cf.model.with_structured_output(Act)
 
         def high_high_level_planner_step(state: State):
@@ -118,7 +167,8 @@ class InteractionAgent:
                         "interaction": state["interaction"],
                         "page_soup": state["page_soup"],
                         "limit": state["limit"],
-                    }
+                    },
+                    config={"callbacks": self._usage_callbacks()},
                 )
                 # adjust length if above limit
                 if len(approaches.approaches) > int(state["limit"]):
@@ -129,13 +179,12 @@ class InteractionAgent:
 
         def high_level_plan_step(state: State):
             print(Text("High Level Planner Step", style="green"))
-            plans = []
+            plans = [None] * len(state["approaches"])
             with Live(refresh_per_second=10) as live:
                 high_level_planner_log = HighLevelPlannerLog(state["approaches"])
+                inputs = []
                 for i, approach in enumerate(state["approaches"]):
-                    high_level_planner_log.update_approach(i, "running")
-                    live.update(high_level_planner_log.render())
-                    plan = high_level_planner.invoke(
+                    inputs.append(
                         {
                             "uri": state["uri"],
                             "interaction": state["interaction"],
@@ -144,79 +193,144 @@ class InteractionAgent:
                             "interaction_context": format_context(state["interaction_context"]),
                         }
                     )
-                    plans.append(plan)
+                # the plans are independent, generate them concurrently (results keep the order of the approaches)
+                concurrency = self.cf.agent_llm_concurrency
+                for i in range(min(concurrency, len(inputs))):
+                    high_level_planner_log.update_approach(i, "running")
+                live.update(high_level_planner_log.render())
+                started = min(concurrency, len(inputs))
+                for i, plan in high_level_planner.batch_as_completed(
+                    inputs, config={"max_concurrency": concurrency, "callbacks": self._usage_callbacks()}
+                ):
+                    plans[i] = plan
                     high_level_planner_log.update_approach(i, "done")
+                    # approaches are started in order as slots free up
+                    if started < len(inputs):
+                        high_level_planner_log.update_approach(started, "running")
+                        started += 1
                     live.update(high_level_planner_log.render())
 
             return {"plans": plans}
 
         def execute_step(state: State):
             print(Text("Execute Step", style="green"))
-            tests = []
-            all_p_reqs_parsed = []
-            observed_uris = []
             uri = state["uri"]
             plans = state["plans"]
-            executor_log = ExecutorLog(plans)
-            with Live(refresh_per_second=10) as live:
-                for i, plan in enumerate(state["plans"]):
-                    context = ToolContext(cf=self.cf, initial_uri=uri)  # Create a new context for each test
-                    tools = self._init_tools(context)
-                    solver = create_react_agent(
-                        self.cf.model, tools=tools, prompt=react_agent_prompt, output_parser=JSONAgentOutputParser()
-                    )
-                    solver_executor = AgentExecutor(agent=solver, tools=tools)
-                    logger.debug("")
-                    logger.debug(f"#### Next Approach: {plan.approach}")
-                    executor_log.update_approach(i, "running")
+            executor_log = ExecutorLog(plans, [self.interaction_budget, self.total_budget])
+            log_lock = threading.Lock()
+            # every test (of every round) starts with the session state captured before the interaction
+            session_state = state["session_state"]
+
+            def update_log(live: Live, i: int, j: int | None, status: str) -> None:
+                with log_lock:
+                    if j is None:
+                        executor_log.update_approach(i, status)
+                    else:
+                        executor_log.update_task(i, j, status)
                     live.update(executor_log.render_tasks())
-                    soup_before = BeautifulSoup(self.cf.driver.page_source, "html.parser")
-                    soup_before = filter_html(soup_before)
+
+            def update_usage(live: Live, i: int, usage: TokenBudget, seconds: float) -> None:
+                with log_lock:
+                    executor_log.update_usage(i, usage.tokens, usage.llm_calls, seconds)
+                    live.update(executor_log.render_tasks())
+
+            def run_approach(live: Live, i: int, plan: PlanModel) -> Tuple[TestModel, List[ApiModel], List[str]]:
+                """
+                Run the plan of one approach in a browser session of its own.
+                """
+                start = time.perf_counter()
+                usage = TokenBudget("approach")
+                with self._lease_driver() as driver:
+                    context = ToolContext(cf=self.cf, driver=driver, initial_uri=uri)  # a new context for each test
+                    solver_executor = self.executors.get(context)
+                    logger.debug(f"#### Next Approach: {plan.approach}")
+                    update_log(live, i, None, "running")
+                    reset_session(driver, self.cf.target, session_state)
+                    get_network_capture(driver).reset()
+                    driver.get(f"{self.cf.target}{uri}")
+                    wait_until_ready(self.cf, driver)
+                    context.reset_page_changes()
                     test = TestModel(
-                        approach=plan.approach, steps=[], soup_before_str=soup_before.prettify(), plan=plan
+                        approach=plan.approach,
+                        steps=[],
+                        snapshot_before=self.snapshots.put(get_snapshot(driver).filtered_str),
+                        plan=plan,
                     )
-                    self.cf.driver.get(f"{self.cf.target}{uri}")
-                    time.sleep(self.cf.selenium_rate)
                     plan_str = "\n".join(plan.plan)
                     for j, task in enumerate(plan.plan):
-                        executor_log.update_task(i, j, "running")
-                        live.update(executor_log.render_tasks())
+                        update_log(live, i, j, "running")
                         logger.debug(f"# Executing task: {task}")
                         completed_task = CompletedTask(task=task)
-                        try:
-                            solved_state = solver_executor.invoke(
-                                {
-                                    "task": task,
-                                    "interaction": state["interaction"],
-                                    "page_soup": state["page_soup"],
-                                    "approach": plan.approach,
-                                    "plan_str": plan_str,
-                                }
+                        exhausted = self._exhausted_budget()
+                        if exhausted is not None:
+                            completed_task.status = "budget_exhausted"
+                            completed_task.result = (
+                                f"Skipped, the {exhausted.name} token budget ({exhausted.limit} tokens) is exhausted."
                             )
-                            completed_task.status = solved_state["output"]["status"]
-                            completed_task.result = solved_state["output"]["result"]
-                        except Exception as e:
-                            completed_task.status = "error"
-                            completed_task.result = str(e)
+                        else:
+                            task_budget = TokenBudget("task", self.cf.agent_task_token_budget)
+                            # checked by the executor before every iteration (the exhausted budget is not an error)
+                            solver_executor.budgets = [task_budget, self.interaction_budget, self.total_budget]
+                            budgets = [task_budget, usage, self.interaction_budget, self.total_budget]
+                            try:
+                                solved_state = solver_executor.invoke(
+                                    {
+                                        "task": task,
+                                        "interaction": state["interaction"],
+                                        "page_soup": state["page_soup"],
+                                        "approach": plan.approach,
+                                        "plan_str": plan_str,
+                                    },
+                                    config={"callbacks": [BudgetCallbackHandler(budgets)]},
+                                )
+                                if stopped_by_limit(solved_state["output"]):
+                                    completed_task.status = "budget_exhausted"
+                                    exhausted = next((b for b in solver_executor.budgets if b.exhausted), None)
+                                    if exhausted is not None:
+                                        completed_task.result = (
+                                            f"Stopped, the {exhausted.name} token budget "
+                                            f"({exhausted.limit} tokens) is exhausted."
+                                        )
+                                    else:
+                                        completed_task.result = (
+                                            f"Stopped by the iteration limit ({self.cf.agent_max_iterations}) "
+                                            f"or time limit ({self.cf.agent_max_execution_time}s) of the task."
+                                        )
+                                else:
+                                    completed_task.status = solved_state["output"]["status"]
+                                    completed_task.result = solved_state["output"]["result"]
+                            except Exception as e:
+                                completed_task.status = "error"
+                                completed_task.result = str(e)
                         completed_task.tool_history = context.get_tool_history_reset()
-                        observed_uris = context.get_observed_uris()
                         test.steps.append(completed_task)
-                        executor_log.update_task(i, j, "done")
-                        live.update(executor_log.render_tasks())
+                        update_log(live, i, j, "budget_exhausted" if completed_task.status == "budget_exhausted" else "done")
+                        update_usage(live, i, usage, time.perf_counter() - start)
                     # getting page source:
-                    original_soup = BeautifulSoup(self.cf.driver.page_source, "html.parser")
-                    soup_after = filter_html(original_soup)
-                    test.soup_after_str = soup_after.prettify()
-                    # parsing page requests and filtering them with LLM
-                    p_reqs = parse_apis(driver=self.cf.driver, target=self.cf.target, uri=uri, filtered=True)
+                    test.snapshot_after = self.snapshots.put(get_snapshot(driver).filtered_str)
+                    # parsing page requests, templating them with rules and falling back to LLM
+                    p_reqs = parse_apis(driver=driver, target=self.cf.target, uri=uri, filtered=True)
                     # p_reqs_llm = llm_parse_requests_for_apis(self.cf, json.dumps(p_reqs, indent=4))
-                    p_reqs_llm = self.llm_page_request_parser.parse_apis(json.dumps(p_reqs, indent=4))
+                    p_reqs_llm = extract_apis(
+                        p_reqs, self.cf.target, self.llm_page_request_parser, self.cf.rule_based_api_parsing
+                    )
                     test.outgoing_requests_after = p_reqs_llm
-                    executor_log.update_approach(i, "done")
-                    live.update(executor_log.render_tasks())
+                    update_log(live, i, None, "done")
+                    return test, p_reqs_llm, context.get_observed_uris()
+
+            # the approaches run concurrently, one per browser session of the pool
+            workers = self.pool.size if self.pool is not None else 1
+            with Live(refresh_per_second=10) as live:
+                with ThreadPoolExecutor(max_workers=min(workers, max(1, len(plans)))) as executor:
+                    results = list(executor.map(lambda args: run_approach(live, *args), enumerate(plans)))
 
-                    tests.append(test)
-                    all_p_reqs_parsed.extend(p_reqs_llm)
+            tests = []
+            all_p_reqs_parsed = []
+            observed_uris = []
+            for test, p_reqs_llm, test_observed_uris in results:
+                tests.append(test)
+                all_p_reqs_parsed.extend(p_reqs_llm)
+                observed_uris.extend(uri for uri in test_observed_uris if uri not in observed_uris)
             return {
                 "tests": state["tests"] + tests,
                 "plans": [],
@@ -234,36 +348,56 @@ class InteractionAgent:
             tests_to_check = [test for test in tests if not test.checked]
             tests_checked = [test for test in tests if test.checked]
             logger.debug(f"Replanner step")
+            exhausted = self._exhausted_budget()
+            if exhausted is not None:
+                # no new plans, the tests are reported as they are
+                logger.debug(f"Replanning skipped, the {exhausted.name} token budget is exhausted")
+                for test in tests_to_check:
+                    test.checked = True
+                    test.in_report = True
+                    tests_checked.append(test)
+                return {"tests": tests_checked, "plans": []}
             high_level_replanner_log = HighLevelReplannerLog(tests_to_check)
             with Live(refresh_per_second=10) as live:
-                for i, test in enumerate(tests_to_check):
+                inputs = []
+                for test in tests_to_check:
+                    # the diff is memoized by the snapshot store, the reporter reuses it
+                    page_source_diff = self.snapshots.diff(test.snapshot_before, test.snapshot_after)
+                    inputs.append(
+                        {
+                            "uri": state["uri"],
+                            "interaction": state["interaction"],
+                            "approach": test.approach,
+                            "previous_plan": "\n".join([f"- {step}" for step in test.plan.plan]),
+                            "steps": format_steps(test.steps),
+                            "outgoing_requests": api_models_to_str(test.outgoing_requests_after),
+                            "page_source_diff": page_source_diff,
+                        }
+                    )
+
+                # the decisions are independent, evaluate the tests concurrently
+                concurrency = self.cf.agent_llm_concurrency
+                for i in range(min(concurrency, len(inputs))):
                     high_level_replanner_log.update_test(i, "running", None)
+                live.update(high_level_replanner_log.render())
+                started = min(concurrency, len(inputs))
+                decisions = [None] * len(inputs)
+                for i, decision in high_level_replanner.batch_as_completed(
+                    inputs, config={"max_concurrency": concurrency, "callbacks": self._usage_callbacks()}
+                ):
+                    decisions[i] = decision
+                    result = "New plan!" if isinstance(decision.action, ReplanModel) else "No new plan is needed"
+                    high_level_replanner_log.update_test(i, "done", result)
+                    if started < len(inputs):
+                        high_level_replanner_log.update_test(started, "running", None)
+                        started += 1
                     live.update(high_level_replanner_log.render())
+
+                for test, decision in zip(tests_to_check, decisions):
                     logger.debug(f"Replanning for approach: {test.approach}")
-                    uri = state["uri"]
-                    interaction = state["interaction"]
-                    page_source_diff = unified_diff(
-                        test.soup_before_str.splitlines(),
-                        test.soup_after_str.splitlines(),
-                        lineterm="",
-                    )
-                    page_source_diff = "\n".join(list(page_source_diff)).strip()
-                    input = {
-                        "uri": uri,
-                        "interaction": interaction,
-                        "approach": test.approach,
-                        "previous_plan": "\n".join([f"- {step}" for step in test.plan.plan]),
-                        "steps": format_steps(test.steps),
-                        "outgoing_requests": api_models_to_str(test.outgoing_requests_after),
-                        "page_source_diff": page_source_diff,
-                    }
-
-                    decision = high_level_replanner.invoke(input=input)
                     if isinstance(decision.action, ReplanModel):
                         logger.debug(f"Decision: New plan is needed")
                         logger.debug(f"New Steps: {decision.action.new_steps}")
-                        high_level_replanner_log.update_test(i, "done", "New plan!")
-                        live.update(high_level_replanner_log.render())
                         test.checked = True
                         test.in_report = False
                         tests_checked.append(test)
@@ -271,8 +405,6 @@ class InteractionAgent:
                         logger.debug(f"New Plan: {new_plan}")
                         new_plans.append(PlanModel(approach=test.approach, plan=new_plan))
                     elif isinstance(decision.action, Response):
-                        high_level_replanner_log.update_test(i, "done", "No new plan is needed")
-                        live.update(high_level_replanner_log.render())
                         logger.debug(f"Decision: No new plan is needed")
                         logger.debug(f"Response: {decision.action.text}")
                         test.checked = True
@@ -301,12 +433,7 @@ class InteractionAgent:
                 tests_to_report = [test for test in state["tests"] if test.in_report]
                 for test in tests_to_report:
                     steps = format_steps(test.steps)
-                    page_source_diff = unified_diff(
-                        test.soup_before_str.splitlines(),
-                        test.soup_after_str.splitlines(),
-                        lineterm="",
-                    )
-                    page_source_diff = "\n".join(list(page_source_diff)).strip()
+                    page_source_diff = self.snapshots.diff(test.snapshot_before, test.snapshot_after)
                     this_human_reporter_prompt = human_reporter_prompt.format(
                         approach=test.approach,
                         plan="\n".join(test.plan.plan),
@@ -320,7 +447,7 @@ class InteractionAgent:
                 reporter_prompt = ChatPromptTemplate.from_messages(messages)
                 reporter = reporter_prompt | self.cf.advanced_model.with_structured_output(ReporterOutput)
 
-                out = reporter.invoke(input={})
+                out = reporter.invoke(input={}, config={"callbacks": self._usage_callbacks()})
                 logger.debug(f"Report:\n{out.report}")
                 reporter_log.update_status("done")
                 live.update(reporter_log.render())
@@ -344,21 +471,29 @@ class InteractionAgent:
         return app
 
     def interact(self, uri: str, interaction: str, limit: str = "3", interaction_context: List[str] = []) -> Tuple[str, List[ApiModel], List[str], List[str]]:
+        # the page states of earlier interactions are not needed anymore
+        self.snapshots = SnapshotStore(self.cf.page_diff_max_changes)
+        self.interaction_budget = TokenBudget("interaction", self.cf.agent_interaction_token_budget)
         # initial steps: navigate and get soup
         self.cf.driver.get(f"{self.cf.target}{uri}")
-        time.sleep(self.cf.selenium_rate)
-        original_soup = BeautifulSoup(self.cf.driver.page_source, "html.parser")
-        soup = filter_html(original_soup).prettify()
-
-        final_state = self.app.invoke(
-            input={
-                "interaction": interaction,
-                "uri": uri,
-                "page_soup": soup,
-                "limit": limit,
-                "interaction_context": interaction_context,
-            }
-        )
+        wait_until_ready(self.cf)
+        soup = get_snapshot(self.cf.driver).render(self.cf.page_representation["interaction_agent"])
+        # the cookies and storage the crawl ended up with, the tests must not change them for the next interactions
+        session_state = get_session_state(self.cf.driver)
+
+        try:
+            final_state = self.app.invoke(
+                input={
+                    "interaction": interaction,
+                    "uri": uri,
+                    "page_soup": soup,
+                    "limit": limit,
+                    "interaction_context": interaction_context,
+                    "session_state": session_state,
+                }
+            )
+        finally:
+            reset_session(self.cf.driver, self.cf.target, session_state)
 
         return (
             final_state["report"],
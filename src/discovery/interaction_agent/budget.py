@@ -0,0 +1,81 @@
+import threading
+from typing import Any, Dict, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.discovery.llm.memory import estimate_tokens
+
+
+class TokenBudget:
+    """
+    Tokens (prompt and completion) and LLM calls spent against an optional limit (None: unlimited).
+    Shared by the concurrent runs of an interaction.
+    """
+
+    def __init__(self, name: str, limit: int | None = None) -> None:
+        self.name = name
+        self.limit = limit
+        self.tokens = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, tokens: int) -> None:
+        with self._lock:
+            self.tokens += tokens
+            self.llm_calls += 1
+
+    @property
+    def exhausted(self) -> bool:
+        return self.limit is not None and self.tokens >= self.limit
+
+    def __str__(self) -> str:
+        return f"{self.tokens}/{self.limit}" if self.limit is not None else str(self.tokens)
+
+
+def stopped_by_limit(output: Any) -> bool:
+    """
+    Whether the output of an AgentExecutor run is the one returned when it was stopped early
+    (max_iterations, max_execution_time or an exhausted budget, see BudgetedAgentExecutor).
+    """
+    return isinstance(output, str) and output.startswith("Agent stopped due to")
+
+
+def _tokens_used(response: LLMResult, prompt_tokens: int) -> int:
+    """
+    Tokens of the LLM call, as reported by the provider, else estimated from the prompt and the completion.
+    """
+    generations = [generation for batch in response.generations for generation in batch]
+    usage = [getattr(getattr(generation, "message", None), "usage_metadata", None) for generation in generations]
+    if generations and all(usage):
+        return sum(metadata["total_tokens"] for metadata in usage)
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if token_usage.get("total_tokens"):
+        return token_usage["total_tokens"]
+    return prompt_tokens + sum(estimate_tokens(generation.text) for generation in generations)
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """
+    Counts the tokens of every LLM call of a run against the given budgets. It never interrupts
+    the run, the callers check the budgets between calls (see BudgetedAgentExecutor).
+    """
+
+    def __init__(self, budgets: List[TokenBudget]) -> None:
+        self.budgets = budgets
+        self._prompt_tokens: Dict[UUID, int] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID, **kwargs):
+        self._prompt_tokens[run_id] = sum(estimate_tokens(str(message.content)) for batch in messages for message in batch)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs):
+        self._prompt_tokens[run_id] = sum(estimate_tokens(prompt) for prompt in prompts)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        tokens = _tokens_used(response, self._prompt_tokens.pop(run_id, 0))
+        for budget in self.budgets:
+            budget.add(tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._prompt_tokens.pop(run_id, None)
@@ -12,6 +12,7 @@ class FillTextFieldInput(BaseModel):
 class FillTextFieldOutput(BaseModel):
     success: bool = Field(description="Whether the text field was filled successfully.")
     message: str = Field(description="The message indicating the result of the operation.")
+    page_changes: Optional[str] = Field(default=None, description="The changes of the page caused by filling in the text field.")
     error: Optional[str] = Field(default=None, description="The error message if the operation failed.")
 
 
@@ -25,6 +26,7 @@ class FillDateFieldInput(BaseModel):
 class FillDateFieldOutput(BaseModel):
     success: bool = Field(description="Whether the date field was filled successfully.")
     message: str = Field(description="The message indicating the result of the operation.")
+    page_changes: Optional[str] = Field(default=None, description="The changes of the page caused by filling in the date field.")
     error: Optional[str] = Field(default=None, description="The error message if the operation failed.")
 
 
@@ -36,7 +38,7 @@ class ClickInput(BaseModel):
 class ClickOutput(BaseModel):
     success: bool = Field(description="Whether the element was clicked successfully.")
     message: str = Field(description="The message indicating the result of the operation.")
-    page_diff: Optional[str] = Field(description="The diff of the page before and after clicking.")
+    page_diff: Optional[str] = Field(description="The changes of the page caused by clicking.")
     error: Optional[str] = Field(default=None, description="The error message if the operation failed.")
 
 
@@ -81,6 +83,7 @@ class SelectOptionInput(BaseModel):
 class SelectOptionOutput(BaseModel):
     success: bool = Field(description="Whether the option was selected successfully.")
     message: str = Field(description="The message indicating the result of the operation.")
+    page_changes: Optional[str] = Field(default=None, description="The changes of the page caused by selecting the option.")
     error: Optional[str] = Field(default=None, description="The error message if the operation failed.")
 
 
@@ -142,7 +145,10 @@ class CompletedTask(BaseModel):
     """Model for representing a completed step of a plan for a single approach."""
 
     task: str = Field(description="The task that was executed.")
-    status: str = Field(default="pending", description="The status of the task.")
+    status: str = Field(
+        default="pending",
+        description="The status of the task (success, failure, incomplete, error, or budget_exhausted if stopped by a limit).",
+    )
     result: str = Field(default="", description="The result of the task.")
     tool_history: List[Tuple[str, AnyInput, AnyOutput]] = Field(default=[], description="The history of tool usage.")
 
@@ -153,8 +159,8 @@ class TestModel(BaseModel):
     approach: str = Field(description="The approach for the interaction feature.")
     plan: PlanModel = Field(description="The plan for this approach.")
     steps: List[CompletedTask] = Field(description="The steps executed for this approach.")
-    soup_before_str: str = Field(description="The soup before the test.")
-    soup_after_str: str = Field(default=None, description="The soup after the test.")
+    snapshot_before: str = Field(description="The key of the page state before the test (see SnapshotStore).")
+    snapshot_after: Optional[str] = Field(default=None, description="The key of the page state after the test.")
     # outgoing_requests_before: List[Dict] = Field(description="The outgoing requests before the test.")
     outgoing_requests_after: List[ApiModel] = Field(default=None, description="The outgoing requests after the test.")
     # TODO: add a flag so the replanner does not need to check this test after checked once and replan is not needed
@@ -0,0 +1,76 @@
+import threading
+import weakref
+from typing import Callable, List, Tuple
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain.agents.output_parsers import JSONAgentOutputParser
+from langchain_core.tools import BaseTool
+
+from config import Config
+from src.discovery.interaction_agent.budget import TokenBudget
+from src.discovery.interaction_agent.prompts import react_agent_prompt
+from src.discovery.interaction_agent.tool_context import ToolContext
+from src.discovery.page_outline import page_formats
+
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that also stops (like at max_iterations) once one of the token budgets of the run is exhausted.
+    The budgets are set by the caller before every run, a budget is exceeded by at most the call that crossed it.
+    """
+
+    budgets: List[TokenBudget] = []
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        return super()._should_continue(iterations, time_elapsed) and not any(
+            budget.exhausted for budget in self.budgets
+        )
+
+
+class ExecutorFactory:
+    """
+    ReAct agent executors of the interaction agent, built once per browser session.
+
+    Building an executor renders the tool descriptions into the prompt and validates every tool,
+    so it is only done for the first run in a session. Later runs in the same session only bind
+    the tools to the ToolContext of the run (sessions are leased by one run at a time).
+    """
+
+    def __init__(self, cf: Config, init_tools: Callable[[ToolContext], List[BaseTool]]) -> None:
+        self.cf = cf
+        self.init_tools = init_tools
+        self._executors: "weakref.WeakKeyDictionary[object, Tuple[BudgetedAgentExecutor, List[BaseTool]]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _build(self, context: ToolContext) -> Tuple[BudgetedAgentExecutor, List[BaseTool]]:
+        tools = self.init_tools(context)
+        prompt = react_agent_prompt.partial(page_format=page_formats[self.cf.page_representation["interaction_agent"]])
+        solver = create_react_agent(self.cf.model, tools=tools, prompt=prompt, output_parser=JSONAgentOutputParser())
+        # a run stopped by a limit returns a fixed output, see budget.stopped_by_limit
+        executor = BudgetedAgentExecutor(
+            agent=solver,
+            tools=tools,
+            max_iterations=self.cf.agent_max_iterations,
+            max_execution_time=self.cf.agent_max_execution_time,
+        )
+        return executor, tools
+
+    def get(self, context: ToolContext) -> BudgetedAgentExecutor:
+        """
+        Return the executor of the session of the given context, with its tools bound to the context.
+        """
+        with self._lock:
+            entry = self._executors.get(context.driver)
+        if entry is None:
+            entry = self._build(context)
+            with self._lock:
+                self._executors[context.driver] = entry
+                self.builds += 1
+            return entry[0]
+        executor, tools = entry
+        for tool in tools:
+            tool.context = context
+        return executor
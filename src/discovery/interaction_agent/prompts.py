@@ -21,7 +21,7 @@ Example 1:
 
 - **URI**: /search
 - **Element**: {{"name": "Search Field", "description": "A field to search for cards."}}
-- **Page Soup**: (HTML code of the page that contains the search field)
+- **Page Soup**: (the page that contains the search field, as {page_format})
 - **Approaches**:
   - Test the search field with a valid query.
   - Test with special characters.
@@ -30,7 +30,7 @@ Example 2:
 
 - **URI**: /login
 - **Element**: {{"name": "Login Button", "description": "A button to log in to the application."}}
-- **Page Soup**: (HTML code of the page that contains the username field, password field, and a login button)
+- **Page Soup**: (the page that contains the username field, password field, and a login button, as {page_format})
 - **Approaches**:
   - Test with a valid, unique username and password.
   - Test with a common username and weak password.
@@ -45,7 +45,7 @@ human_high_high_level_planner_prompt = """
 *URI*: {uri}
 *Element*:
 {interaction}
-*Page Soup*:
+*Page Soup* (as {page_format}):
 {page_soup}
 
 
@@ -97,7 +97,7 @@ Input:
 - Element:
   {{"name": "Register Form", "description": "A form to register a new user"}}
 - Approach: Test the registration form with valid inputs for username and password.
-- Page Soup: HTML code of the page
+- Page Soup: the page as {page_format}
 - Context: -
 
 Output:
@@ -116,7 +116,7 @@ Input:
 - Element:
   {{"name": "Login Form", "description": "A form to log in to the application"}}
 - Approach: Test the login form with valid inputs.
-- Page Soup: HTML code of the page
+- Page Soup: the page as {page_format}
 - Context: user_test_123:SecurePass$123 are valid credentials
 
 Output:
@@ -135,7 +135,7 @@ human_high_level_planner_prompt = """
 {interaction}
 *Approach*:
 {approach}
-*Page Soup*:
+*Page Soup* (as {page_format}):
 ```
 {page_soup}
 ```
@@ -169,7 +169,7 @@ The feature you are testing is:
 
 {interaction}
 Only execute a single step of this plan. The page is already loaded and you have access to the page soup.
-Page Soup:
+Page Soup (as {page_format}):
 {page_soup}
 """
 
@@ -261,7 +261,7 @@ If you have completed the task, respond with the final answer directly.
 """
 
 human_react_agent_prompt = """
-Website source page:
+Website source page (as {page_format}):
 ```
 {page_soup}
 ```
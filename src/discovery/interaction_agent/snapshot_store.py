@@ -0,0 +1,31 @@
+from typing import Dict, Tuple
+
+from src.discovery.classes.blob_store import BlobStore
+from src.discovery.dom_diff import diff_html
+
+
+class SnapshotStore(BlobStore):
+    """
+    Page states of the tests of one interaction (filtered, prettified HTML), compressed and
+    deduplicated: tests only hold the keys, so the agent state stays small however many
+    approaches and replans run. Diffs between two states are computed once.
+    """
+
+    def __init__(self, max_changes: int = 50) -> None:
+        super().__init__()
+        self.max_changes = max_changes
+        self.diffs: Dict[Tuple[str, str], str] = {}
+
+    def diff(self, before: str, after: str | None) -> str:
+        """
+        Return the structural diff between the page states with the given keys.
+        """
+        if after is None or before == after:
+            return ""
+        with self.lock:
+            page_diff = self.diffs.get((before, after))
+        if page_diff is None:
+            page_diff = diff_html(self.get(before), self.get(after), self.max_changes)
+            with self.lock:
+                self.diffs[(before, after)] = page_diff
+        return page_diff
@@ -1,9 +1,12 @@
-from typing import List, Dict, Tuple, Union
+from typing import Any, List, Dict, Optional, Tuple, Union
 
 from pydantic import BaseModel, Field
 from langchain_core.messages import AnyMessage
 
 from config import Config
+from src.discovery.browser.page_changes import format_page_changes, take_page_changes
+from src.discovery.browser.snapshot import get_snapshot
+from src.discovery.dom_diff import diff_soups
 from src.discovery.interaction_agent.classes import AnyInput, AnyOutput
 
 
@@ -12,9 +15,14 @@ class ToolContext(BaseModel):
     """Stores additional information about tool usage for each test of an interaction."""
 
     cf: Config
+    driver: Any = Field(description="The WebDriver session the tools act on (leased from the browser pool).")
     tool_history: List[Tuple[str, AnyInput, AnyOutput]] = Field(default=[], description="The history of tool usage.")
     initial_uri: str = Field(description="The initial URI of the page.")
     observed_uris: List[str] = Field(default=[], description="The list of URIs observed during the interaction.")
+    last_doc_id: Optional[str] = Field(default=None, description="The id of the document seen by the last tool call.")
+    last_snapshot: Optional[Any] = Field(
+        default=None, description="The snapshot of the page when the last document was loaded."
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -31,3 +39,33 @@ class ToolContext(BaseModel):
     def add_observed_uri(self, uri: str):
         if uri not in self.observed_uris:
             self.observed_uris.append(uri)
+
+    def reset_page_changes(self):
+        """
+        Start recording page changes from the current page state.
+        """
+        changes = take_page_changes(self.driver, self.cf.page_diff_max_changes)
+        self.last_doc_id = changes["docId"] if changes is not None else None
+        self.last_snapshot = get_snapshot(self.driver)
+
+    def get_page_changes(self) -> str:
+        """
+        Describe the page changes since the previous call, as recorded in the browser.
+        The page source is only fetched if a new document was loaded (or changes are not recorded).
+        """
+        changes = take_page_changes(self.driver, self.cf.page_diff_max_changes)
+        if changes is not None and changes["docId"] == self.last_doc_id:
+            return format_page_changes(changes)
+
+        snapshot = get_snapshot(self.driver)
+        if self.last_snapshot is not None:
+            page_diff = diff_soups(
+                self.last_snapshot.filtered_soup, snapshot.filtered_soup, self.cf.page_diff_max_changes
+            )
+        else:
+            page_diff = snapshot.filtered_str
+        self.last_snapshot = snapshot
+        if changes is None:
+            return page_diff or "No changes on the page."
+        self.last_doc_id = changes["docId"]
+        return f"Navigated to {changes['url']}\n{page_diff}".strip()
@@ -14,6 +14,7 @@ from config import Config
 
 # from src.discovery.interaction_agent.context import Context
 from src.discovery.utils import extract_uri
+from src.discovery.browser.readiness import wait_until_ready
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
 from src.discovery.interaction_agent.classes import FillDateFieldInput, FillDateFieldOutput
@@ -34,6 +35,7 @@ class FillDateField(BaseTool):
         "Returns:\n"
         "  - success: bool Whether the date field was filled successfully.\n"
         "  - message: str The message indicating the result of the operation.\n"
+        "  - page_changes: str The changes of the page caused by filling in the date field.\n"
         "  - error: str The error message if the operation failed.\n"
     )
     args_schema: Type[BaseModel] = FillDateFieldInput
@@ -46,7 +48,7 @@ class FillDateField(BaseTool):
         try:
             formatted_date = f"{month_value}-{day_value}-{year_value}"  # match the american locale
             logger.debug(f"Filling in the date field {xpath_identifier} with {formatted_date}")
-            element = self.cf.driver.find_element(By.XPATH, xpath_identifier)
+            element = self.context.driver.find_element(By.XPATH, xpath_identifier)
             # clear the field first
             element.clear()
             element.send_keys(Keys.CONTROL + "a")
@@ -54,14 +56,17 @@ class FillDateField(BaseTool):
             element.send_keys(50 * Keys.BACKSPACE)
 
             element.send_keys(formatted_date)
+            wait_until_ready(self.cf, self.context.driver)
             actual_value = element.get_attribute("value")
 
             # self.context.note_uri(self.cf)
             output = FillDateFieldOutput(
-                success=True, message=f"Filled in the date field {xpath_identifier} with {formatted_date}."
+                success=True,
+                message=f"Filled in the date field {xpath_identifier} with {formatted_date}.",
+                page_changes=self.context.get_page_changes(),
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             # logging.error(str(e))
@@ -14,6 +14,7 @@ from config import Config
 
 # from src.discovery.interaction_agent.context import Context
 from src.discovery.utils import extract_uri
+from src.discovery.browser.readiness import wait_until_ready
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
 from src.discovery.interaction_agent.classes import FillTextFieldInput, FillTextFieldOutput
@@ -32,6 +33,7 @@ class FillTextField(BaseTool):
         "Returns:\n"
         "  - success: bool Whether the text field was filled successfully.\n"
         "  - message: str The message indicating the result of the operation.\n"
+        "  - page_changes: str The changes of the page caused by filling in the text field.\n"
         "  - error: str The error message if the operation failed.\n"
     )
     args_schema: Type[BaseModel] = FillTextFieldInput
@@ -41,7 +43,7 @@ class FillTextField(BaseTool):
         input = FillTextFieldInput(xpath_identifier=xpath_identifier, value=value)
         try:
             logger.debug(f"Filling in the text field {xpath_identifier} with {value}")
-            element = self.cf.driver.find_element(By.XPATH, xpath_identifier)
+            element = self.context.driver.find_element(By.XPATH, xpath_identifier)
             # clear the field first
             element.clear()
             element.send_keys(Keys.CONTROL + "a")
@@ -49,14 +51,17 @@ class FillTextField(BaseTool):
             element.send_keys(50 * Keys.BACKSPACE)
 
             element.send_keys(value)
+            wait_until_ready(self.cf, self.context.driver)
             actual_value = element.get_attribute("value")
 
             # self.context.note_uri(self.cf)
             output = FillTextFieldOutput(
-                success=True, message=f"Filled in the text field {xpath_identifier} with {value}."
+                success=True,
+                message=f"Filled in the text field {xpath_identifier} with {value}.",
+                page_changes=self.context.get_page_changes(),
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             # logging.error(str(e))
@@ -14,6 +14,7 @@ from selenium.webdriver.common.keys import Keys
 from config import Config
 
 # from src.discovery.interaction_agent.context import Context
+from src.discovery.browser.snapshot import get_snapshot
 from src.discovery.utils import extract_uri, filter_html
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
@@ -42,7 +43,7 @@ class GetElement(BaseTool):
         input = GetElementInput(xpath_identifier=xpath_identifier)
         try:
             logger.debug(f"Getting element with xpath_identifier: {xpath_identifier}")
-            res = BeautifulSoup(self.cf.driver.page_source, "html.parser")
+            res = get_snapshot(self.context.driver).soup
             # self.last_page_soup = res
 
             element = res.find(xpath_identifier)
@@ -55,7 +56,7 @@ class GetElement(BaseTool):
                 element=element.prettify(),
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             logger.debug("Error: Failed to get the element.")
@@ -42,17 +42,18 @@ class GetOutgoingRequests(BaseTool):
         try:
             logger.debug(f"Getting outgoing requests with filtered: {filtered}")
             p_reqs = parse_apis(
-                driver=self.cf.driver,
+                driver=self.context.driver,
                 target=self.cf.target,
                 uri=self.context.initial_uri,
                 filtered=filtered,
+                consume=False,
             )
             p_reqs_str = json.dumps(p_reqs, indent=4)
             output = GetOutgoingRequestsOutput(
                 success=True, message=f"Got outgoing requests with filtered: {filtered}.", outgoing_requests=p_reqs_str
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             logging.debug("Error: Failed to get outgoing requests.")
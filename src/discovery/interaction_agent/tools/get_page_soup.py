@@ -14,7 +14,8 @@ from selenium.webdriver.common.keys import Keys
 from config import Config
 
 # from src.discovery.interaction_agent.context import Context
-from src.discovery.utils import extract_uri, filter_html
+from src.discovery.browser.snapshot import get_snapshot
+from src.discovery.utils import extract_uri
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
 from src.discovery.interaction_agent.classes import GetPageSoupInput, GetPageSoupOutput
@@ -32,7 +33,7 @@ class GetPageSoup(BaseTool):
         "Returns:\n"
         "  - success: bool Whether the page source was retrieved successfully.\n"
         "  - message: str The message indicating the result of the operation.\n"
-        "  - page_source: str The page source.\n"
+        "  - page_source: str The page source (or its outline, if configured).\n"
         "  - error: str The error message if the operation failed.\n"
     )
     args_schema: Type[BaseModel] = GetPageSoupInput
@@ -42,21 +43,22 @@ class GetPageSoup(BaseTool):
         input = GetPageSoupInput(filtered=filtered)
         try:
             logger.debug(f"Getting page source with filtered: {'True' if filtered else 'False'}")
-            res = BeautifulSoup(self.cf.driver.page_source, "html.parser")
-            # self.last_page_soup = res
-
+            snapshot = get_snapshot(self.context.driver)
             if filtered:
-                res = filter_html(res)
+                page_source = snapshot.render(self.cf.page_representation["get_page_soup"])
+            else:
+                page_source = snapshot.soup.prettify()
+            # self.last_page_soup = res
 
             # self.note_uri()
-            logger.debug(res.prettify())
+            logger.debug(page_source)
             output = GetPageSoupOutput(
                 success=True,
                 message=f"Got page source with filtered: {'True' if filtered else 'False'}.",
-                page_source=res.prettify(),
+                page_source=page_source,
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             logging.debug("Error: Failed to fill in the text field.")
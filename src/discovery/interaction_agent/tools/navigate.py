@@ -14,6 +14,7 @@ from config import Config
 
 # from src.discovery.interaction_agent.context import Context
 from src.discovery.utils import extract_uri
+from src.discovery.browser.readiness import wait_until_ready
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
 from src.discovery.interaction_agent.classes import NavigateInput, NavigateOutput
@@ -40,13 +41,15 @@ class Navigate(BaseTool):
         input = NavigateInput(url=url)
         try:
             logger.debug(f"Navigating to the URL {url}")
-            self.cf.driver.get(url)
-            time.sleep(self.cf.selenium_rate)
+            self.context.driver.get(url)
+            wait_until_ready(self.cf, self.context.driver)
 
-            url_now = self.cf.driver.current_url
+            url_now = self.context.driver.current_url
+            # the changes of later tools are relative to the new page
+            self.context.reset_page_changes()
             output = NavigateOutput(success=True, message=f"Navigated to the URL {url}. Actual URL now: {url_now}")
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             logging.debug("Error: Failed to navigate to the URL.")
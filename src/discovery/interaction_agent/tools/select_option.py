@@ -14,6 +14,7 @@ from config import Config
 
 # from src.discovery.interaction_agent.context import Context
 from src.discovery.utils import extract_uri
+from src.discovery.browser.readiness import wait_until_ready
 from src.discovery.interaction_agent.tool_context import ToolContext
 from src.log import logger
 from src.discovery.interaction_agent.classes import SelectOptionInput, SelectOptionOutput
@@ -32,6 +33,7 @@ class SelectOption(BaseTool):
         "Returns:\n"
         "  - success: bool Whether the option was selected successfully.\n"
         "  - message: str The message indicating the result of the operation.\n"
+        "  - page_changes: str The changes of the page caused by selecting the option.\n"
         "  - error: str The error message if the operation failed.\n"
     )
     args_schema: Type[BaseModel] = SelectOptionInput
@@ -41,18 +43,20 @@ class SelectOption(BaseTool):
         input = SelectOptionInput(xpath_identifier=xpath_identifier, visible_value=visible_value)
         try:
             logger.debug(f"Selecting option with value: {visible_value}")
-            element = self.cf.driver.find_element(By.XPATH, xpath_identifier)
+            element = self.context.driver.find_element(By.XPATH, xpath_identifier)
             select = Select(element)
             select.select_by_visible_text(visible_value)
+            wait_until_ready(self.cf, self.context.driver)
 
             actual_value = select.first_selected_option.text
 
             output = SelectOptionOutput(
                 success=True,
                 message=f"Selected option: {xpath_identifier} with value: {visible_value}. Actual value now: {actual_value}.",
+                page_changes=self.context.get_page_changes(),
             )
             self.context.tool_history.append((self.name, input, output))
-            self.context.add_observed_uri(extract_uri(self.cf.driver.current_url))
+            self.context.add_observed_uri(extract_uri(self.context.driver.current_url))
             return output
         except Exception as e:
             logging.debug("Error: Failed to select option.")
@@ -1,24 +1,35 @@
 from typing import List
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
 
 from src.discovery.llm.model_classes import ApiModel, ApiModelList
 from src.discovery.llm.messages import api_system_message
+from src.discovery.llm.memory import ConversationMemory
 from src.log import logger
 
 
 class LLM_ApiParser:
     def __init__(self, cf):
         self.chain = cf.model.with_structured_output(ApiModelList)
-        self.messages = [SystemMessage(api_system_message)]
+        self.memory = ConversationMemory(
+            api_system_message,
+            window=cf.llm_history_window,
+            token_budget=cf.llm_history_token_budget,
+            digest_header="APIs parsed so far, keep using the same paths and URL path parameter names:",
+        )
 
     def parse_apis(self, page_requests: str) -> List[ApiModel]:
         """
         Parse APIs of the given performance logs, using LLM.
         """
         logger.debug("Parsing page requests")
-        self.messages.append(HumanMessage(page_requests))
-        apis = self.chain.invoke(self.messages) # returns a object of type ApiModelList
+        human_message = HumanMessage(page_requests)
+        # invoke on a snapshot of the history, so parallel browser workers can share the parser
+        apis = self.chain.invoke(self.memory.build(human_message)) # returns a object of type ApiModelList
         #  append the output to the messages
-        self.messages.append(AIMessage(str(apis)))
+        digest = {}
+        for api in apis.apis:
+            path_params = ", ".join(api.url_path_params.keys()) if api.url_path_params else "none"
+            digest[f"{api.method} {api.path}"] = f"- {api.method} {api.path} (URL path params: {path_params})"
+        self.memory.record(human_message, AIMessage(str(apis)), digest)
 
         return apis.apis
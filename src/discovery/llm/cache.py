@@ -0,0 +1,69 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from src.log import logger
+
+
+class LLMCacheMissError(Exception):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Persistent, content-addressed cache for LLM responses, stored in SQLite.
+
+    Responses are keyed by the hash of the llm string (model, parameters, bound tools /
+    structured-output schema, stop words) and the serialized messages.
+    In replay mode a cache miss raises LLMCacheMissError instead of calling the model.
+    """
+
+    def __init__(self, path: str, replay: bool = False) -> None:
+        self.path = path
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, llm_string TEXT, response TEXT, created REAL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if row is None:
+            if self.replay:
+                raise LLMCacheMissError(f"No cached LLM response for key {key} (replay mode)")
+            return None
+        logger.debug(f"LLM cache hit: {key}")
+        return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, llm_string, response, created) VALUES (?, ?, ?, ?)",
+                (key, llm_string, dumps(list(return_val)), time.time()),
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
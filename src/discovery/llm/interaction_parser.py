@@ -1,24 +1,104 @@
-from typing import List
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from langchain_core.messages import HumanMessage, AIMessage
 
 from src.discovery.llm.model_classes import InteractionModel, InteractionModelList
 from src.discovery.llm.messages import interaction_system_message
+from src.discovery.llm.memory import ConversationMemory
+from src.discovery.page_outline import page_formats
 from src.log import logger
 
 import json
 
+
+def input_field_signature(interaction: InteractionModel) -> Tuple[str, ...]:
+    """
+    Signature of the input fields of the interaction (their xpaths, else their names, ignoring order and case).
+    """
+    return tuple(
+        sorted((field.get("xpath") or field.get("name") or "").strip().lower() for field in interaction.input_fields)
+    )
+
+
+def merge_interactions(chunks: List[List[InteractionModel]]) -> List[InteractionModel]:
+    """
+    Merge the interactions parsed from the chunks of one page.
+
+    Interactions with the same name are merged (the input fields of both are kept). An interaction
+    with another name but the same input fields as one of another chunk is dropped (a repeated
+    component named differently in each chunk). Within a chunk, interactions with the same input
+    fields are kept (e.g. a search and a filter form that both only have a text field q).
+    """
+    merged: Dict[str, InteractionModel] = {}
+    signatures: Dict[Tuple[str, ...], int] = {}  # signature -> chunk it was first seen in
+    for index, interactions in enumerate(chunks):
+        for interaction in interactions:
+            name = interaction.name.strip().lower()
+            if name in merged:
+                existing = merged[name]
+                known_fields = {(field.get("name"), field.get("type")) for field in existing.input_fields}
+                for field in interaction.input_fields:
+                    if (field.get("name"), field.get("type")) not in known_fields:
+                        existing.input_fields.append(field)
+                        known_fields.add((field.get("name"), field.get("type")))
+                continue
+            signature = input_field_signature(interaction)
+            if any(signature) and signatures.get(signature, index) != index:
+                logger.debug(f"Dropping interaction {interaction.name}, same input fields as one of another chunk")
+                continue
+            merged[name] = interaction.model_copy(deep=True)
+            signatures.setdefault(signature, index)
+    return list(merged.values())
+
+
 class LLM_InteractionParser:
     def __init__(self, cf):
         self.chain = cf.model.with_structured_output(InteractionModelList)
-        self.messages = [SystemMessage(interaction_system_message)]
+        self.max_workers = cf.interaction_chunk_workers
+        self.memory = ConversationMemory(
+            interaction_system_message.format(page_format=page_formats[cf.page_representation["interaction_parser"]]),
+            window=cf.llm_history_window,
+            token_budget=cf.llm_history_token_budget,
+            digest_header="Interactions parsed on previous pages, reuse the same name, description and input_fields:",
+        )
+
+    def _parse(self, page: str) -> Tuple[HumanMessage, InteractionModelList]:
+        human_message = HumanMessage(page)
+        return human_message, self.chain.invoke(self.memory.build(human_message))
 
-    def parse_interactions(self, soup) -> List[InteractionModel]:
+    def _record(self, human_message: HumanMessage, interactions: InteractionModelList) -> None:
+        digest = {
+            interaction.name: f"- {json.dumps(interaction.model_dump())}" for interaction in interactions.interactions
+        }
+        self.memory.record(human_message, AIMessage(str(interactions)), digest)
+
+    def parse_interactions(self, page: str) -> List[InteractionModel]:
         """
-        Parse interactions of the given soup, using LLM.
+        Parse interactions of the given page (HTML or outline), using LLM.
         """
         logger.debug("Parsing interactions")
-        self.messages.append(HumanMessage(soup.prettify()))
-        interactions = self.chain.invoke(self.messages)
-        self.messages.append(AIMessage(str(interactions)))
-        
-        return interactions.interactions
\ No newline at end of file
+        human_message, interactions = self._parse(page)
+        self._record(human_message, interactions)
+
+        return interactions.interactions
+
+    def parse_interactions_chunked(self, chunks: List[str]) -> List[InteractionModel]:
+        """
+        Parse interactions of the given page chunks concurrently, using LLM.
+
+        All chunks see the same history, the results are merged and deduplicated (see merge_interactions)
+        and only the merged interactions are recorded.
+        """
+        if len(chunks) == 1:
+            return self.parse_interactions(chunks[0])
+        logger.debug(f"Parsing interactions in {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            results = list(executor.map(self._parse, chunks))
+        interactions = merge_interactions([result.interactions for _, result in results])
+        # one exchange for the page, the raw chunks would fill the history with copies of the same page
+        self._record(
+            HumanMessage(f"(page parsed in {len(chunks)} chunks, the merged interactions follow)"),
+            InteractionModelList(interactions=interactions),
+        )
+
+        return interactions
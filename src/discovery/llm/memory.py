@@ -0,0 +1,87 @@
+import threading
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate for the given text (about 4 characters per token).
+    """
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """
+    Conversation history of an LLM parser.
+
+    Without a window or token budget the full history is resent on every call.
+    Otherwise only the most recent exchanges are kept, and a compact digest of all
+    prior results is sent instead, so names stay consistent across pages.
+    """
+
+    def __init__(
+        self,
+        system_message: str,
+        window: int | None = None,
+        token_budget: int | None = None,
+        digest_header: str = "Results of previously parsed pages:",
+    ) -> None:
+        self.system_message = SystemMessage(system_message)
+        self.window = window
+        self.token_budget = token_budget
+        self.digest_header = digest_header
+
+        self.exchanges: List[Tuple[BaseMessage, BaseMessage]] = []
+        self.digest: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        # the lock can not be pickled (checkpoints)
+        with self.lock:
+            state = self.__dict__.copy()
+            state["exchanges"] = list(self.exchanges)
+            state["digest"] = dict(self.digest)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    @property
+    def bounded(self) -> bool:
+        return self.window is not None or self.token_budget is not None
+
+    def build(self, human_message: BaseMessage) -> List[BaseMessage]:
+        """
+        Build the messages for the next call, ending with the given human message.
+        """
+        with self.lock:
+            messages = [self.system_message]
+            if self.bounded and self.digest:
+                digest = "\n".join(self.digest.values())
+                messages.append(SystemMessage(f"{self.digest_header}\n{digest}"))
+            for human, ai in self.exchanges:
+                messages += [human, ai]
+        messages.append(human_message)
+        return messages
+
+    def record(self, human_message: BaseMessage, ai_message: BaseMessage, digest: Dict[str, str] | None = None) -> None:
+        """
+        Record an exchange and update the digest of prior results.
+        """
+        with self.lock:
+            self.exchanges.append((human_message, ai_message))
+            if digest:
+                self.digest.update(digest)
+            self._trim()
+
+    def _trim(self) -> None:
+        if self.window is not None:
+            self.exchanges = self.exchanges[-self.window :] if self.window > 0 else []
+        if self.token_budget is not None:
+            tokens = [estimate_tokens(str(human.content)) + estimate_tokens(str(ai.content)) for human, ai in self.exchanges]
+            while self.exchanges and sum(tokens) > self.token_budget:
+                self.exchanges.pop(0)
+                tokens.pop(0)
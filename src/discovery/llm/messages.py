@@ -1,7 +1,8 @@
+# Formatted with the page_format of the representation (see page_outline.page_formats)
 summary_system_message = """
 You are an AI model that has been tasked with summarizing pages.
 
-You will be given a page in HTML format. Create a short and consice summary that page.
+You will be given a page as {page_format}. Create a short and consice summary that page.
 Focus on the main funcionality of only the provided page not others. Ignore boilerplate elements and code.
 
 Avoid repeating information. Do not make assumptions about the content of other pages on the website.
@@ -13,8 +14,9 @@ The summary does not need to include the function of the entire website, only of
 Keep the summary to a maximum of 1-2 sentences. The summary has to be neutral and objective.
 """
 
+# Formatted with the page_format of the representation (see page_outline.page_formats)
 interaction_system_message = """
-In the following tasks, you will receive HTML content from web pages. Your job is to identify and extract all user interactions on each page individually. An interaction is defined as any element or group of elements that allows users to submit information or perform actions on the website. This includes, but is not limited to, forms, buttons, and other interactive JavaScript elements. Links and other non-interactive elements should be excluded.
+In the following tasks, you will receive web pages as {page_format}. Your job is to identify and extract all user interactions on each page individually. An interaction is defined as any element or group of elements that allows users to submit information or perform actions on the website. This includes, but is not limited to, forms, buttons, and other interactive JavaScript elements. Links and other non-interactive elements should be excluded.
 
 For each interaction, you will return a JSON object with the following structure:
 - name: A descriptive name for the interaction.
@@ -35,17 +37,17 @@ Example Output:
         name="Login Form",
         description="A form that allows users to log into the website.",
         input_fields=[
-            {"name": "username", "type": "text"},
-            {"name": "password", "type": "password"},
-            {"name": "submit", "type": "button"}
+            {{"name": "username", "type": "text"}},
+            {{"name": "password", "type": "password"}},
+            {{"name": "submit", "type": "button"}}
         ]
     ),
     InteractionModel(
         name="Search Bar",
         description="A bar where users can enter search queries.",
         input_fields=[
-            {"name": "search_query", "type": "text"},
-            {"name": "search_button", "type": "button"}
+            {{"name": "search_query", "type": "text"}},
+            {{"name": "search_button", "type": "button"}}
         ]
     )
 ]
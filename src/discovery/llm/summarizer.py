@@ -1,20 +1,27 @@
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage
 
 from src.discovery.llm.messages import summary_system_message
+from src.discovery.llm.memory import ConversationMemory
+from src.discovery.page_outline import page_formats
 from src.log import logger
 
 class LLM_Summarizer:
     def __init__(self, cf):
         self.chain = cf.model | cf.parser
-        self.messages = [SystemMessage(summary_system_message)]
+        # summaries do not depend on earlier pages, so no digest is kept
+        self.memory = ConversationMemory(
+            summary_system_message.format(page_format=page_formats[cf.page_representation["summarizer"]]),
+            window=cf.llm_history_window,
+            token_budget=cf.llm_history_token_budget,
+        )
 
-    def create_summary(self, soup):
+    def create_summary(self, page: str):
         """
-        Create a summary of the given soup, using LLM.
+        Create a summary of the given page (HTML or outline), using LLM.
         """
         logger.debug("Creating summary")
-        self.messages.append(HumanMessage(soup.prettify()))
-        summary = self.chain.invoke(self.messages)
-        self.messages.append(summary)
+        human_message = HumanMessage(page)
+        summary = self.chain.invoke(self.memory.build(human_message))
+        self.memory.record(human_message, AIMessage(summary))
         
-        return summary
\ No newline at end of file
+        return summary
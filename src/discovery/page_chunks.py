@@ -0,0 +1,97 @@
+from typing import List
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import Comment
+
+from src.discovery.llm.memory import estimate_tokens
+
+# Elements kept whole in one chunk (if they fit at all): splitting them would split an interaction
+atomic_tags = {"form", "dialog", "fieldset", "select"}
+
+
+def _pack(units: List[str], token_budget: int, separator: str = "\n", header: str = "") -> List[str]:
+    """
+    Greedily pack consecutive units into chunks of at most token_budget tokens (single oversized units stay whole).
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    tokens = estimate_tokens(header)
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and tokens + unit_tokens > token_budget:
+            chunks.append(header + separator.join(current))
+            current, tokens = [], estimate_tokens(header)
+        current.append(unit)
+        tokens += unit_tokens
+    if current:
+        chunks.append(header + separator.join(current))
+    return chunks
+
+
+def _html_units(node: Tag, token_budget: int) -> List[str]:
+    """
+    Split the node into units of at most token_budget tokens, at element boundaries.
+    Oversized elements are split into their children, except for forms and other atomic elements.
+    """
+    units: List[str] = []
+    for child in node.children:
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            if child.strip():
+                units.append(child.strip())
+            continue
+        if not isinstance(child, Tag):
+            continue
+        html = child.prettify()
+        if estimate_tokens(html) <= token_budget or child.name in atomic_tags or not child.find(True):
+            units.append(html)
+        else:
+            units.extend(_html_units(child, token_budget))
+    return units
+
+
+def chunk_html(soup: BeautifulSoup, token_budget: int) -> List[str]:
+    """
+    Split the (filtered) soup into prettified HTML chunks of about token_budget tokens,
+    at form and section boundaries. Forms are never split.
+    """
+    html = soup.prettify()
+    if estimate_tokens(html) <= token_budget:
+        return [html]
+    return _pack(_html_units(soup.body or soup, token_budget), token_budget)
+
+
+def _outline_units(lines: List[str], token_budget: int) -> List[str]:
+    """
+    Split outline lines into units of at most token_budget tokens, at entries of the top indentation level.
+    Oversized containers are split into their entries, repeating the container line in every unit.
+    """
+    entries: List[List[str]] = []
+    indent = len(lines[0]) - len(lines[0].lstrip()) if lines else 0
+    for line in lines:
+        if not entries or len(line) - len(line.lstrip()) <= indent:
+            entries.append([line])
+        else:
+            entries[-1].append(line)
+
+    units: List[str] = []
+    for entry in entries:
+        text = "\n".join(entry)
+        if estimate_tokens(text) <= token_budget or len(entry) == 1 or entry[0].lstrip().startswith("- form"):
+            units.append(text)
+        else:
+            header = entry[0] + "\n"
+            nested = _outline_units(entry[1:], token_budget - estimate_tokens(header))
+            units.extend(_pack(nested, token_budget, header=header))
+    return units
+
+
+def chunk_outline(outline: str, token_budget: int) -> List[str]:
+    """
+    Split the page outline into chunks of about token_budget tokens, at landmark and form boundaries.
+    Forms are never split.
+    """
+    if estimate_tokens(outline) <= token_budget:
+        return [outline]
+    return _pack(_outline_units(outline.splitlines(), token_budget), token_budget)
@@ -0,0 +1,319 @@
+from typing import Dict, List
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import Comment
+
+from src.discovery.utils import remove_tags
+
+TEXT_LENGTH = 100
+MAX_OPTIONS = 10
+
+# How the page representations (cf.page_representation) are described to the LLM in the prompts
+page_formats = {
+    "html": "HTML code",
+    "outline": "a page outline: one line per element with its role, name, state and XPath locator",
+}
+
+# Elements whose (named) children are nested under them in the outline
+container_roles = {
+    "nav": "navigation",
+    "main": "main",
+    "header": "banner",
+    "footer": "contentinfo",
+    "aside": "complementary",
+    "form": "form",
+    "dialog": "dialog",
+    "fieldset": "group",
+    "table": "table",
+    "ul": "list",
+    "ol": "list",
+}
+# Roles of input types (others are textboxes)
+input_roles = {
+    "checkbox": "checkbox",
+    "radio": "radio",
+    "button": "button",
+    "submit": "button",
+    "reset": "button",
+    "image": "button",
+    "number": "spinbutton",
+    "range": "slider",
+    "search": "searchbox",
+    "file": "file",
+}
+# Elements ending a run of text
+block_tags = {
+    "p", "div", "li", "td", "th", "tr", "dd", "dt", "section", "article", "br", "hr",
+    "pre", "blockquote", "figcaption", "caption", "summary", "details", "label", "legend",
+}  # fmt: skip
+control_tags = {"input", "textarea", "select", "button"}
+interactive_roles = {
+    "button", "link", "checkbox", "radio", "switch", "tab", "menuitem", "option",
+    "textbox", "searchbox", "combobox", "slider", "spinbutton", "listbox",
+}  # fmt: skip
+
+
+def _trim(text: str, length: int = TEXT_LENGTH) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length] + "..."
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', "'") + '"'
+
+
+class PageOutline:
+    """
+    Compact outline of the interactive and semantic elements of a page, for LLM prompts.
+
+    One line per element with its role, accessible name and state, controls also get a stable
+    XPath locator (by id, else by name, else by position). Landmarks, forms, tables and lists
+    nest their content, other markup is flattened into trimmed runs of text:
+
+        - main
+          - heading "Sign in" [level=1]
+          - form #login (POST /api/login)
+            - textbox "Email" name=email [type=email, required] xpath=//*[@id="email"]
+            - button "Sign in" [type=submit] xpath=//form[@id="login"]/button
+          - text: "Forgot your password? Contact support."
+
+    Tags removed by filter_html (scripts, styles, links, ...) are skipped here as well.
+    """
+
+    def __init__(self, soup: BeautifulSoup) -> None:
+        self.soup = soup
+        self.labels: Dict[str, str] = {}  # control id -> text of its <label for=...>
+        self.names: Dict[tuple, int] = {}  # (tag, name) -> number of controls
+        self.ids: Dict[str, str] = {}  # id -> text, for aria-labelledby
+        self.positions: Dict[int, tuple] = {}  # id(parent) -> sibling positions, see _position
+        for tag in soup.find_all(True):
+            if tag.get("id"):
+                self.ids.setdefault(tag["id"], "")
+            if tag.name == "label" and tag.get("for"):
+                self.labels[tag["for"]] = _trim(tag.get_text(" "))
+            elif tag.name in control_tags and tag.get("name"):
+                key = (tag.name, tag["name"])
+                self.names[key] = self.names.get(key, 0) + 1
+
+    def _text_of_id(self, id: str) -> str:
+        if not self.ids.get(id):
+            element = self.soup.find(id=id)
+            self.ids[id] = _trim(element.get_text(" ")) if element is not None else ""
+        return self.ids[id]
+
+    @staticmethod
+    def _hidden(tag: Tag) -> bool:
+        return (
+            tag.has_attr("hidden")
+            or tag.get("aria-hidden") == "true"
+            or (tag.name == "input" and tag.get("type", "").lower() == "hidden")
+        )
+
+    def _locator(self, tag: Tag) -> str:
+        if tag.get("id"):
+            return f'//*[@id="{tag["id"]}"]'
+        if tag.get("name") and self.names.get((tag.name, tag["name"])) == 1:
+            return f'//{tag.name}[@name="{tag["name"]}"]'
+        parts = []
+        node = tag
+        while isinstance(node, Tag) and node.name != "[document]":
+            if node is not tag and node.get("id"):
+                return f'//{node.name}[@id="{node["id"]}"]/' + "/".join(parts)
+            position, count = self._position(node)
+            parts.insert(0, f"{node.name}[{position}]" if count > 1 else node.name)
+            node = node.parent
+        return "/" + "/".join(parts)
+
+    def _position(self, tag: Tag) -> tuple:
+        """
+        Position of the tag among its siblings with the same name (1-based) and their number.
+        Computed once per parent, so locating all controls of a long list stays linear.
+        """
+        parent = tag.parent
+        if parent is None:
+            return 1, 1
+        positions = self.positions.get(id(parent))
+        if positions is None:
+            counts: Dict[str, int] = {}
+            indexes = {}
+            for child in parent.children:
+                if isinstance(child, Tag):
+                    counts[child.name] = counts.get(child.name, 0) + 1
+                    indexes[id(child)] = counts[child.name]
+            positions = (indexes, counts)
+            self.positions[id(parent)] = positions
+        indexes, counts = positions
+        return indexes[id(tag)], counts[tag.name]
+
+    def _name(self, tag: Tag, role: str) -> str:
+        if tag.get("aria-label"):
+            return _trim(tag["aria-label"])
+        if tag.get("aria-labelledby"):
+            name = " ".join(self._text_of_id(id) for id in tag["aria-labelledby"].split())
+            if name.strip():
+                return _trim(name)
+        if tag.get("id") in self.labels:
+            return self.labels[tag["id"]]
+        label = tag.find_parent("label")
+        if label is not None:
+            text = "".join(
+                str(string) for string in label.find_all(string=True) if not isinstance(string, Comment)
+                and string.find_parent(control_tags) is None
+            )  # fmt: skip
+            if text.strip():
+                return _trim(text)
+        if tag.name in ("button", "option") or role in ("heading", "button", "clickable", "tab", "menuitem"):
+            text = tag.get_text(" ")
+            if text.strip():
+                return _trim(text)
+        if tag.name == "input" and role == "button" and tag.get("value"):
+            return _trim(tag["value"])
+        if tag.name == "fieldset":
+            legend = tag.find("legend")
+            if legend is not None:
+                return _trim(legend.get_text(" "))
+        for attribute in ("placeholder", "title", "alt"):
+            if tag.get(attribute):
+                return _trim(tag[attribute])
+        return ""
+
+    @staticmethod
+    def _role(tag: Tag) -> str | None:
+        if tag.get("role"):
+            return tag["role"].split()[0]
+        if tag.name in container_roles:
+            return container_roles[tag.name]
+        if tag.name in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            return "heading"
+        if tag.name == "input":
+            return input_roles.get(tag.get("type", "text").lower(), "textbox")
+        if tag.name == "textarea":
+            return "textbox"
+        if tag.name == "select":
+            return "listbox" if tag.has_attr("multiple") else "combobox"
+        if tag.name == "button":
+            return "button"
+        if tag.name == "img" and tag.get("alt"):
+            return "img"
+        if tag.name in ("section", "article") and (tag.get("aria-label") or tag.get("aria-labelledby")):
+            return "region"
+        if tag.has_attr("onclick") or tag.get("tabindex", "-1") != "-1":
+            return "clickable"
+        return None
+
+    def _line(self, tag: Tag, role: str) -> str:
+        line = f"- {role}"
+        if role in container_roles.values() and tag.get("id"):
+            line += f" #{tag['id']}"
+        name = self._name(tag, role)
+        if name:
+            line += f" {_quote(name)}"
+        if role == "form":
+            line += f" ({tag.get('method', 'get').upper()} {tag.get('action') or 'no action'})"
+        if tag.name in control_tags and tag.get("name"):
+            line += f" name={tag['name']}"
+
+        states = []
+        if role == "heading" and tag.name.startswith("h"):
+            states.append(f"level={tag.name[1]}")
+        if tag.name in ("input", "button") and tag.get("type"):
+            states.append(f"type={tag['type']}")
+        for state in ("required", "disabled", "readonly", "checked", "multiple"):
+            if tag.has_attr(state):
+                states.append(state)
+        if tag.name == "input" and tag.get("value") and role not in ("button", "checkbox", "radio"):
+            states.append(f"value={_quote(_trim(tag['value'], 40))}")
+        if states:
+            line += f" [{', '.join(states)}]"
+
+        if tag.name == "select":
+            options = [_trim(option.get_text(" "), 40) for option in tag.find_all("option")]
+            selected = tag.find("option", selected=True)
+            if selected is not None:
+                line += f" selected={_quote(_trim(selected.get_text(' '), 40))}"
+            line += f" options: {', '.join(options[:MAX_OPTIONS])}"
+            if len(options) > MAX_OPTIONS:
+                line += f" (+{len(options) - MAX_OPTIONS} more)"
+        if tag.name in control_tags or role in interactive_roles or role == "clickable":
+            line += f" xpath={self._locator(tag)}"
+        return line
+
+    def _children(self, tag: Tag, depth: int) -> List[str]:
+        lines: List[str] = []
+        text: List[str] = []
+        indent = "  " * depth
+
+        def flush() -> None:
+            if text:
+                joined = _trim(" ".join(text))
+                if joined:
+                    lines.append(f"{indent}- text: {_quote(joined)}")
+                text.clear()
+
+        for child in tag.children:
+            if isinstance(child, NavigableString):
+                if type(child) is NavigableString and child.strip():
+                    text.append(str(child))
+                continue
+            if not isinstance(child, Tag) or child.name in remove_tags or self._hidden(child):
+                continue
+            if child.name == "label" and child.get("for") in self.ids:
+                continue  # names its control
+            if child.name == "label" and child.find(control_tags) is not None:
+                # the label names the controls it wraps
+                flush()
+                for control in child.find_all(control_tags):
+                    if not self._hidden(control):
+                        lines.append(indent + self._line(control, self._role(control)))
+                continue
+            if child.name == "tr" and child.find(control_tags) is None:
+                flush()
+                cells = [_trim(cell.get_text(" "), 40) for cell in child.find_all(("td", "th"), recursive=False)]
+                if any(cells):
+                    lines.append(f"{indent}- row: {_quote(' | '.join(cells))}")
+                continue
+
+            role = self._role(child)
+            if role is None or role in ("presentation", "none", "generic"):
+                if child.name in block_tags:
+                    flush()
+                    lines.extend(self._children(child, depth))
+                else:
+                    # inline markup continues the current run of text
+                    nested = self._children(child, depth)
+                    if len(nested) == 1 and nested[0].startswith(f"{indent}- text: "):
+                        text.append(child.get_text(" "))
+                    else:
+                        flush()
+                        lines.extend(nested)
+                continue
+
+            flush()
+            if role in container_roles.values() or role == "region":
+                nested = self._children(child, depth + 1)
+                if nested:
+                    lines.append(indent + self._line(child, role))
+                    lines.extend(nested)
+            elif role == "clickable" and child.find(control_tags) is not None:
+                # e.g. a clickable table row with its own buttons
+                lines.append(f"{indent}- clickable xpath={self._locator(child)}")
+                lines.extend(self._children(child, depth + 1))
+            elif role in ("heading", "img", "clickable") or child.name in control_tags or role in interactive_roles:
+                # leaf: the name already holds the content
+                lines.append(indent + self._line(child, role))
+            else:
+                lines.append(indent + self._line(child, role))
+                lines.extend(self._children(child, depth + 1))
+        flush()
+        return lines
+
+    def render(self) -> str:
+        body = self.soup.body or self.soup
+        return "\n".join(self._children(body, 0))
+
+
+def page_outline(soup: BeautifulSoup) -> str:
+    """
+    Return the compact outline of the given (unfiltered) soup, see PageOutline.
+    """
+    return PageOutline(soup).render()
@@ -1,14 +1,16 @@
 import json
-import copy
-from typing import List
+from typing import List, Tuple
 from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder, ParserRejectedMarkup
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
 
 from src.discovery.llm.model_classes import ApiModel
 from src.discovery.interaction_agent.classes import CompletedTask
 from src.discovery.classes.siteinfo import SiteInfo
 from src.discovery.classes.page import Page
+from src.discovery.browser.network import get_network_capture
 from src.log import logger
 
 remove_file_extensions = [
@@ -24,38 +26,33 @@ remove_file_extensions = [
     ".woff2",
 ]
 
-def parse_apis(driver, target: str, uri: str, filtered: bool = True) -> List[dict]:
+remove_mime_types = [
+    "image/",
+    "font/",
+    "text/css",
+]
+
+def parse_apis(driver, target: str, uri: str, filtered: bool = True, consume: bool = True) -> List[dict]:
     """
-    Parse the page requests from the driver's performance logs.
+    Parse the page requests captured for the driver since the last drain.
+
+    With consume=False the requests stay available for the next call.
     """
-    logs = driver.get_log("performance")
-    ts = driver.execute_script("return window.performance.timing.navigationStart")
-    p_logs = [log for log in logs if log["timestamp"] > ts]
+    capture = get_network_capture(driver)
+    requests = capture.drain() if consume else capture.peek()
 
     page_requests = []
-    for log in p_logs:
-        log = json.loads(log["message"])["message"]
-        if log["method"] == "Network.requestWillBeSent":
-            if filtered: # Filter out unnecessary requests
-                if (
-                    log["params"]["request"]["url"] == target + uri
-                    and log["params"]["request"]["method"] == "GET"
-                ):
-                    continue # ignore initial page request
-                if any(
-                    [
-                        log["params"]["request"]["url"].endswith(ext)
-                        for ext in remove_file_extensions
-                    ]
-                ):
-                    continue # ignore requests with file extensions
-            page_request = {
-                "url": log["params"]["request"]["url"],
-                "method": log["params"]["request"]["method"],
-                "headers": log["params"]["request"]["headers"],
-                "postData": log["params"]["request"].get("postData"),
-            }
-            page_requests.append(page_request)
+    for request in requests:
+        if filtered: # Filter out unnecessary requests
+            if request["url"] == target + uri and request["method"] == "GET":
+                continue # ignore initial page request
+            if any([request["url"].endswith(ext) for ext in remove_file_extensions]):
+                continue # ignore requests with file extensions
+            if request["mimeType"] and any(
+                [request["mimeType"].startswith(mime_type) for mime_type in remove_mime_types]
+            ):
+                continue # ignore static resources served without file extensions
+        page_requests.append(request)
     return page_requests
 
 
@@ -68,49 +65,99 @@ def parse_links(soup: BeautifulSoup) -> List[str]:
         links.append(link.get("href"))
     return links
 
-def filter_html(soup: BeautifulSoup) -> BeautifulSoup:
+# Removed from the HTML given to the LLM, with their content
+remove_tags = ["script", "style", "meta", "link", "noscript", "a"]
+# Attribute prefixes kept in the HTML given to the LLM
+keep_attributes = (
+    "id",
+    "class",
+    "aria-",
+    "role",
+    "href",
+    "placeholder",
+    "name",
+    "type",
+    "src",
+    "alt",
+)
+
+
+class FilteringHTMLParser(BeautifulSoupHTMLParser):
+    """
+    BeautifulSoup's html.parser, dropping removed tags (with their content) and attributes
+    while the tree is built, so the page is filtered in the same pass it is parsed.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.skipped_tags: List[str] = []  # open tags inside the removed tag being skipped
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, str | None]], handle_empty_element: bool = True) -> None:
+        if self.skipped_tags:
+            if tag not in self.soup.builder.empty_element_tags:
+                self.skipped_tags.append(tag)
+            return
+        if tag in remove_tags:
+            if tag not in self.soup.builder.empty_element_tags:
+                self.skipped_tags.append(tag)
+            return
+        attrs = [(name, value) for name, value in attrs if name.startswith(keep_attributes)]
+        super().handle_starttag(tag, attrs, handle_empty_element)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, str | None]]) -> None:
+        if self.skipped_tags or tag in remove_tags:
+            return
+        super().handle_startendtag(tag, attrs)
+
+    def handle_endtag(self, tag: str, check_already_closed: bool = True) -> None:
+        if self.skipped_tags:
+            if tag in self.skipped_tags:
+                while self.skipped_tags.pop() != tag:
+                    pass
+                return
+            # the end tag of a parent implicitly closes the removed tag
+            self.skipped_tags = []
+        super().handle_endtag(tag, check_already_closed)
+
+    def handle_data(self, data: str) -> None:
+        if not self.skipped_tags:
+            super().handle_data(data)
+
+    def handle_comment(self, data: str) -> None:
+        if not self.skipped_tags:
+            super().handle_comment(data)
+
+
+class FilteringTreeBuilder(HTMLParserTreeBuilder):
+    def feed(self, markup: str) -> None:
+        args, kwargs = self.parser_args
+        parser = FilteringHTMLParser(self.soup, *args, **kwargs)
+        try:
+            parser.feed(markup)
+            parser.close()
+        except AssertionError as e:
+            raise ParserRejectedMarkup(e)
+        parser.already_closed_empty_element = []
+
+
+def filter_page_source(page_source: str) -> BeautifulSoup:
     """
     Experimental: TODO: Make sure no important content is removed.
 
-    Filter the given soup. Remove unnecessary tags and attributes (for LLM).
-    
+    Parse and filter the given page source in a single pass. Remove unnecessary tags and attributes (for LLM).
+
+    Returns the filtered soup.
+    """
+    return BeautifulSoup(page_source, builder=FilteringTreeBuilder())
+
+
+def filter_html(soup: BeautifulSoup) -> BeautifulSoup:
+    """
+    Filter the given soup, see filter_page_source. The given soup is not modified.
+
     Returns the filtered soup.
     """
-    # Copy the soup to avoid modifying the original
-    soup_cpy = copy.deepcopy(soup)
-    remove_tags = ["script", "style", "meta", "link", "noscript", "a"]
-    keep_attributes = [
-            "id",
-            "class",
-            "aria-",
-            "role",
-            "href",
-            "placeholder",
-            "name",
-            "type",
-            "src",
-            "alt",
-        ]
-    keep_classes = ["btn", "nav", "search", "form", "input"]
-    
-    for tag in soup_cpy(remove_tags):
-        tag.extract()
-
-    # TODO: this seems to be too aggressive, reduce tokens in different ways
-    for tag in soup_cpy.find_all(True):
-        for attribute in list(tag.attrs):
-            if not any(attribute.startswith(prefix) for prefix in keep_attributes):
-                del tag.attrs[attribute]
-    #         # Remove unnecessary classes, 
-    #         elif attribute == "class":
-    #             important_classes = [
-    #                 cls
-    #                 for cls in tag.attrs["class"]
-    #                 if any(cls.startswith(prefix) for prefix in keep_classes)
-    #             ]
-    #             tag.attrs["class"] = important_classes if important_classes else None
-
-    return soup_cpy
+    return filter_page_source(str(soup))
 
 def format_steps(steps: List[CompletedTask]) -> str:
     """
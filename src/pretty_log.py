@@ -5,6 +5,7 @@ from rich.table import Table
 from rich.text import Text
 from rich import print
 
+from src.discovery.interaction_agent.budget import TokenBudget
 from src.discovery.interaction_agent.classes import PlanModel, TestModel
 
 
@@ -14,6 +15,7 @@ def get_status_display(status):
         "done": (Text("✓ completed", style="bold blue"), "bold dim"),
         "waiting": (Text("waiting...", style="bold yellow"), "bold dim"),
         "skipped": (Text("skipped", style="bold yellow"), "bold dim"),
+        "budget_exhausted": (Text("budget exhausted", style="bold red"), "bold dim"),
     }.get(status, (Text(status), "bold"))
 
 
@@ -24,14 +26,20 @@ def get_initial_table():
     return table
 
 
+def format_usage(tokens: int, llm_calls: int, seconds: float) -> str:
+    return f"{tokens} tokens, {llm_calls} LLM calls, {seconds:.1f}s"
+
+
 class ExecutorLog:
-    def __init__(self, plans: List[PlanModel]):
+    def __init__(self, plans: List[PlanModel], budgets: List[TokenBudget] = []):
         self.data = self._init_data(plans)
+        # budgets shown below the totals (interaction, whole run)
+        self.budgets = budgets
 
     def _init_data(self, plans: List[PlanModel]):
         data = []
         for plan in plans:
-            this_test = {"approach": plan.approach, "tasks": [], "status": "waiting"}
+            this_test = {"approach": plan.approach, "tasks": [], "status": "waiting", "usage": None}
             for task in plan.plan:
                 this_test["tasks"].append({"name": task, "status": "waiting"})
             data.append(this_test)
@@ -47,7 +55,19 @@ class ExecutorLog:
                 for task in test["tasks"]:
                     status_display, style = get_status_display(task["status"])
                     table.add_row(Text(f"  • Task: {task['name']}", style=style), status_display)
-
+                if test["usage"] is not None:
+                    table.add_row(Text(f"  • Usage: {format_usage(*test['usage'])}", style=style), "")
+
+        usages = [test["usage"] for test in self.data if test["usage"] is not None]
+        if usages:
+            # the approaches run concurrently, the time is the longest of them
+            total = format_usage(
+                sum(usage[0] for usage in usages), sum(usage[1] for usage in usages), max(usage[2] for usage in usages)
+            )
+            table.add_row(Text(f"Total: {total}", style="bold"), "")
+            for budget in self.budgets:
+                if budget.limit is not None:
+                    table.add_row(Text(f"  • {budget.name.capitalize()} budget: {budget} tokens", style="bold dim"), "")
         return table
 
     def update_approach(self, approach_index: int, status: str):
@@ -56,6 +76,9 @@ class ExecutorLog:
     def update_task(self, approach_index: int, task_index: int, status: str):
         self.data[approach_index]["tasks"][task_index]["status"] = status
 
+    def update_usage(self, approach_index: int, tokens: int, llm_calls: int, seconds: float):
+        self.data[approach_index]["usage"] = (tokens, llm_calls, seconds)
+
 
 class HighHighLevelPlannerLog:
     def __init__(self):
@@ -154,7 +177,35 @@ class DiscoveryLog:
             status_display, style = get_status_display(status)
             table.add_row(Text(f" • {task}", style=style), status_display)
         return table
-    
+
+
+class BrowserPoolLog:
+    def __init__(self, size: int):
+        self.data = self._init_data(size)
+
+    def _init_data(self, size: int):
+        data = []
+        for _ in range(size):
+            data.append({"uri": None, "discovery_log": None})
+        return data
+
+    def update_worker(self, worker_index: int, uri: str | None, discovery_log: DiscoveryLog | None):
+        self.data[worker_index]["uri"] = uri
+        self.data[worker_index]["discovery_log"] = discovery_log
+
+    def render(self) -> Table:
+        table = get_initial_table()
+        for i, worker in enumerate(self.data):
+            if worker["discovery_log"] is None:
+                status_display, style = get_status_display("waiting")
+                table.add_row(Text(f"Browser {i + 1}: idle", style=style), status_display)
+                continue
+            table.add_row(Text(f"Browser {i + 1}: {worker['uri']}", style="bold green"), "")
+            for task, status in worker["discovery_log"].data.items():
+                status_display, style = get_status_display(status)
+                table.add_row(Text(f" • {task}", style=style), status_display)
+        return table
+
 class RankerLog:
     def __init__(self):
         self.status = "waiting"